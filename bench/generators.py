@@ -0,0 +1,95 @@
+"""
+Детерминированные генераторы входных данных для бенчмарков.
+
+Каждый генератор получает размер и зерно и возвращает данные в том виде, в
+котором их принимает точка входа задачи: CSV-текст рёбер (task0-task2),
+строки JSON ранжировок (task3), массив температур (task4).
+"""
+
+import json
+from typing import Tuple
+
+import numpy as np
+
+
+def edges_to_csv(src: np.ndarray, dst: np.ndarray) -> str:
+    return "".join(f"{u},{v}\n" for u, v in zip(src.tolist(), dst.tolist()))
+
+
+def random_dag(n: int, avg_degree: float = 4.0, seed: int = 0) -> str:
+    """Случайный DAG на вершинах 1..n: рёбра идут вперёд по случайной перестановке"""
+    rng = np.random.default_rng(seed)
+    m = int(n * avg_degree)
+    a = rng.integers(0, n, m)
+    b = rng.integers(0, n, m)
+    keep = a != b
+    lo, hi = np.minimum(a, b)[keep], np.maximum(a, b)[keep]
+    labels = rng.permutation(n) + 1
+    # Вершина n всегда присутствует (размер матрицы равен n): ребро из первой
+    # по порядку вершины в n не нарушает ацикличность
+    src = np.append(labels[lo], labels[0])
+    dst = np.append(labels[hi], n if labels[0] != n else labels[1])
+    return edges_to_csv(src, dst)
+
+
+def chain(n: int, seed: int = 0) -> Tuple[str, str]:
+    """Цепочка 1 -> 2 -> ... -> n (максимальная глубина)"""
+    nodes = np.arange(1, n + 1)
+    return edges_to_csv(nodes[:-1], nodes[1:]), "1"
+
+
+def star(n: int, seed: int = 0) -> Tuple[str, str]:
+    """Корень 1 и n - 1 листьев (максимальная ширина уровня)"""
+    leaves = np.arange(2, n + 1)
+    return edges_to_csv(np.ones(n - 1, dtype=np.int64), leaves), "1"
+
+
+def kary_tree(n: int, k: int = 3, seed: int = 0) -> Tuple[str, str]:
+    """Сбалансированное k-арное дерево; метки перемешаны, порядок рёбер случаен"""
+    rng = np.random.default_rng(seed)
+    child = np.arange(1, n)
+    parent = (child - 1) // k
+    labels = np.concatenate(([1], rng.permutation(n - 1) + 2))
+    order = rng.permutation(n - 1)
+    return edges_to_csv(labels[parent[order]], labels[child[order]]), "1"
+
+
+TREE_SHAPES = {"chain": chain, "star": star, "kary": kary_tree}
+
+
+def random_ranking(n: int, tie: float = 0.3, missing: float = 0.0, seed: int = 0) -> list:
+    """Ранжировка объектов 1..n: случайный порядок, соседи объединяются в кластер с вероятностью tie"""
+    rng = np.random.default_rng(seed)
+    objects = rng.permutation(n) + 1
+    objects = objects[rng.random(n) >= missing].tolist()
+    ranking, i = [], 0
+    while i < len(objects):
+        k = 1
+        while i + k < len(objects) and rng.random() < tie:
+            k += 1
+        group = objects[i:i + k]
+        ranking.append(group if k > 1 else group[0])
+        i += k
+    return ranking
+
+
+def random_rankings(n: int, seed: int = 0) -> Tuple[str, str]:
+    return (json.dumps(random_ranking(n, seed=seed)), json.dumps(random_ranking(n, seed=seed + 1)))
+
+
+def adversarial_rankings(n: int, seed: int = 0, group: int = 4) -> Tuple[str, str]:
+    """Противоположные порядки с мелкими кластерами: ядро противоречий -- почти все пары"""
+    objects = list(range(1, n + 1))
+    forward = [objects[i:i + group] for i in range(0, n, group)]
+    backward = [g[::-1] for g in forward[::-1]]
+    return json.dumps(forward), json.dumps(backward)
+
+
+RANKING_SHAPES = {"random": random_rankings, "adversarial": adversarial_rankings}
+
+
+def temperature_sweep(count: int, low: float = -10.0, high: float = 40.0, seed: int = 0) -> np.ndarray:
+    """Равномерная развёртка плюс случайные показания того же диапазона"""
+    rng = np.random.default_rng(seed)
+    half = count // 2
+    return np.concatenate((np.linspace(low, high, half), rng.uniform(low, high, count - half)))
@@ -0,0 +1,237 @@
+"""
+Бенчмарки точек входа task0-task4 на синтетических данных растущего размера.
+
+Каждый случай запускается в отдельном процессе (spawn), поэтому пиковый RSS
+относится только к нему. Время -- лучшее из --repeat запусков без
+tracemalloc; пик tracemalloc снимается отдельным запуском. Кэши моделей
+(RANKING_CACHE, MODEL_CACHE) очищаются перед каждым запуском.
+
+Результат -- JSON со списком записей {task, case, size, wall_s, peak_rss_kb,
+tracemalloc_peak_kb}. С --baseline время сравнивается с сохранённым
+результатом, и при замедлении больше чем на --threshold код возврата равен 1.
+
+    python bench/run.py --out bench/results.json
+    python bench/run.py --quick --baseline bench/results.json --threshold 0.25
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import generators
+
+TASKS = ("task0", "task1", "task2", "task3", "task4")
+
+# Размеры по задачам; --quick оставляет только первый
+SIZES = {
+    "task0": [200, 500, 1000],
+    "task1": [200, 500, 1000],
+    "task2": [10_000, 100_000, 1_000_000],
+    "task3": [100, 400, 1600],
+    "task4": [1_000, 10_000, 100_000],
+}
+
+
+def load_task(name: str):
+    # Все модули задач называются task.py, поэтому загружаются под своими именами
+    path = os.path.join(ROOT, name, "task.py")
+    spec = importlib.util.spec_from_file_location(f"{name}_task", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def reset_caches(module) -> None:
+    for attr in ("RANKING_CACHE", "MODEL_CACHE"):
+        cache = getattr(module, attr, None)
+        if cache is not None:
+            cache.clear()
+
+
+def build_case(task: str, case: str, size: int, seed: int, workdir: str) -> Tuple[Callable, tuple]:
+    """Функция точки входа и её аргументы; подготовка данных в замер не входит"""
+    module = load_task(task)
+    if task == "task0":
+        path = os.path.join(workdir, f"dag-{size}.csv")
+        with open(path, "w") as fh:
+            fh.write(generators.random_dag(size, seed=seed))
+        return lambda p, mode: (reset_caches(module), module.main(p, mode)), (path, case)
+    if task in ("task1", "task2"):
+        s, e = generators.TREE_SHAPES[case](size, seed=seed)
+        entry = module.main if task == "task1" else module.task
+        return lambda s, e: entry(s, e), (s, e)
+    if task == "task3":
+        a, b = generators.RANKING_SHAPES[case](size, seed=seed)
+        return lambda a, b: (reset_caches(module), module.main(a, b)), (a, b)
+
+    temps = generators.temperature_sweep(size, seed=seed)
+    docs = [module.read_json(os.path.join(ROOT, "task4", f"{name}.json"))
+            for name in ("temperature", "heat_lvl", "mapping")]
+    if case == "scalar":
+        def run(temps):
+            reset_caches(module)
+            return [module.main(*docs, x) for x in temps.tolist()]
+    else:
+        def run(temps):
+            reset_caches(module)
+            return module.main_batch(*docs, temps)
+    return run, (temps,)
+
+
+CASES = {
+    "task0": ["dense", "csr", "packed"],
+    "task1": ["chain", "star", "kary"],
+    "task2": ["chain", "star", "kary"],
+    "task3": ["random", "adversarial"],
+    "task4": ["scalar", "batch"],
+}
+
+
+def _peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В macOS ru_maxrss в байтах, в Linux -- в килобайтах
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def measure(task: str, case: str, size: int, seed: int, repeat: int) -> Dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        fn, args = build_case(task, case, size, seed, workdir)
+
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(*args)
+            best = min(best, time.perf_counter() - start)
+
+        tracemalloc.start()
+        fn(*args)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "task": task,
+        "case": case,
+        "size": size,
+        "wall_s": best,
+        "peak_rss_kb": _peak_rss_kb(),
+        "tracemalloc_peak_kb": traced_peak // 1024,
+    }
+
+
+def _child(conn, *params) -> None:
+    try:
+        conn.send(("ok", measure(*params)))
+    except BaseException as exc:  # ошибка случая не должна останавливать весь прогон
+        conn.send(("error", f"{type(exc).__name__}: {exc}"))
+    finally:
+        conn.close()
+
+
+def run_isolated(task: str, case: str, size: int, seed: int, repeat: int) -> Dict:
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(child, task, case, size, seed, repeat))
+    proc.start()
+    child.close()
+    try:
+        status, payload = parent.recv()
+    except EOFError:
+        status, payload = "error", f"процесс завершился с кодом {proc.exitcode}"
+    proc.join()
+    if status == "error":
+        return {"task": task, "case": case, "size": size, "error": payload}
+    return payload
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float, min_time: float) -> List[str]:
+    """Случаи, время которых выросло больше чем в (1 + threshold) раз"""
+    known = {(r["task"], r["case"], r["size"]): r for r in baseline if "wall_s" in r}
+    regressions = []
+    for r in results:
+        base = known.get((r["task"], r["case"], r["size"]))
+        if base is None or "wall_s" not in r or base["wall_s"] < min_time:
+            continue
+        ratio = r["wall_s"] / base["wall_s"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{r['task']}/{r['case']}/{r['size']}: {base['wall_s']:.4f} c -> {r['wall_s']:.4f} c (x{ratio:.2f})"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки task0-task4 на синтетических данных")
+    parser.add_argument("--tasks", default=",".join(TASKS), help="задачи через запятую")
+    parser.add_argument("--quick", action="store_true", help="только наименьший размер")
+    parser.add_argument("--repeat", type=int, default=3, help="число замеров времени (берётся лучший)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="файл для результатов JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="сохранённый результат для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимое относительное замедление")
+    parser.add_argument("--min-time", type=float, default=0.005,
+                        help="случаи с базовым временем меньше этого не сравниваются (шум)")
+    args = parser.parse_args(argv)
+
+    tasks = [t for t in args.tasks.split(",") if t]
+    unknown = set(tasks) - set(TASKS)
+    if unknown:
+        parser.error(f"неизвестные задачи: {sorted(unknown)}")
+
+    results = []
+    for task in tasks:
+        for case in CASES[task]:
+            for size in SIZES[task][:1] if args.quick else SIZES[task]:
+                record = run_isolated(task, case, size, args.seed, args.repeat)
+                results.append(record)
+                shown = record.get("error") or f"{record['wall_s']:.4f} c, RSS {record['peak_rss_kb']} КиБ"
+                print(f"{task}/{case}/{size}: {shown}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+    failed = [r for r in results if "error" in r]
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_time)
+        for line in regressions:
+            print(f"Замедление: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+LRU-кэш разобранных моделей для task3 и task4.
+
+Ключ -- хеш blake2b содержимого входных строк JSON, значение -- уже
+построенная модель (векторы уровней ранжировки, таблицы термов и универсум
+нечёткого регулятора). Повторный вызов с теми же документами обходится без
+json.loads и построения модели.
+
+Размер кэша ограничен и числом записей, и оценкой занимаемой памяти; счётчики
+попаданий и промахов позволяют подобрать оба предела.
+"""
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Union
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_BYTES = 64 << 20  # 64 МиБ
+
+
+def content_key(*parts: Union[str, bytes]) -> bytes:
+    """Хеш набора строк; длина каждой части входит в хеш, поэтому ("ab", "c") != ("a", "bc")"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        data = part.encode("utf-8") if isinstance(part, str) else bytes(part)
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.digest()
+
+
+def estimate_size(value, _seen: Optional[set] = None) -> int:
+    """Приблизительный объём объекта в байтах (массивы NumPy -- по nbytes)"""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + (0 if value.base is None else value.nbytes)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += estimate_size(vars(value), seen)
+    return size
+
+
+class LRUCache:
+    """
+    Кэш с вытеснением давно не использованных записей.
+
+    Аргументы:
+        max_entries: наибольшее число записей
+        max_bytes: наибольший суммарный объём значений (по sizeof)
+        sizeof: функция оценки объёма значения
+
+    Атрибуты:
+        hits, misses: число попаданий и промахов get / get_or_build
+        evictions: число вытесненных записей
+        nbytes: текущий суммарный объём значений
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 sizeof: Callable[[object], int] = estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = self.misses = self.evictions = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value, size: Optional[int] = None) -> None:
+        size = self.sizeof(value) if size is None else size
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            # Значение больше всего бюджета не кэшируется вовсе
+            if size > self.max_bytes or self.max_entries <= 0:
+                return
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            self._shrink()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], object]):
+        """Значение из кэша или результат build(), который затем кэшируется"""
+        marker = self._entries  # не может оказаться значением
+        value = self.get(key, marker)
+        if value is marker:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def resize(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._shrink()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _shrink(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.nbytes -= size
+            self.evictions += 1
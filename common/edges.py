@@ -0,0 +1,214 @@
+"""
+Общая потоковая загрузка списка рёбер из CSV для task0, task1 и task2.
+
+Формат входа -- по одному ребру в строке: "начало,конец". Данные читаются
+блоками фиксированного размера (или через mmap), каждый блок обрезается по
+последнему переводу строки и разбирается целиком средствами NumPy, без
+разбиения на строки в Python. Результат -- пара массивов int32 (src, dst).
+
+Для нечисловых меток вершин используется таблица интернирования VertexTable:
+каждая новая метка получает следующий по порядку код.
+
+Пустые строки (и блоки, целиком состоящие из пробельных символов) пропускаются;
+строка с другим числом полей -- ошибка:
+
+    load_edges_from_string("1,2\n\n1,3\n", 4)   # (array([1, 1]), array([2, 3]))
+    load_edges_from_string("1,2,3\n4,5,6\n")     # ValueError
+    load_edges_from_string("1,2 3,4\n")           # ValueError
+"""
+
+import mmap
+import warnings
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 МиБ
+
+_INT32_MIN = np.iinfo(np.int32).min
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+class VertexTable:
+    """Таблица интернирования: метка вершины <-> плотный целочисленный код"""
+
+    def __init__(self, labels: Iterable[str] = ()):
+        self.labels: List[str] = []
+        self._codes = {}
+        for label in labels:
+            self.intern(label)
+
+    def intern(self, label: str) -> int:
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def code(self, label: str) -> int:
+        """Код уже известной метки (KeyError, если метки нет)"""
+        return self._codes[label]
+
+    def __getitem__(self, code: int) -> str:
+        return self.labels[code]
+
+    def __contains__(self, label: str) -> bool:
+        return label in self._codes
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+def _split_blocks(blocks: Iterable[bytes]) -> Iterator[bytes]:
+    """Перенарезает поток байтов так, чтобы каждый блок заканчивался на '\\n'"""
+    tail = b""
+    for block in blocks:
+        if not block:
+            continue
+        cut = block.rfind(b"\n")
+        if cut < 0:
+            tail += block
+            continue
+        lines = tail + block[:cut + 1]
+        tail = block[cut + 1:]
+        # np.fromstring разбирает блок из одних пробельных символов как [0]
+        if lines.strip():
+            yield lines
+    if tail.strip():
+        yield tail
+
+
+# Порядок событий в корректной строке: поле, запятая, поле, перевод строки
+_FIELD, _COMMA, _NEWLINE = 0, 1, 2
+_LINE_PATTERN = np.array([_FIELD, _COMMA, _FIELD, _NEWLINE], dtype=np.int8)
+
+
+def _check_int_block(block: bytes) -> None:
+    """Каждая непустая строка -- ровно одна запятая и по одному полю с каждой стороны"""
+    data = np.frombuffer(block, dtype=np.uint8)
+    newline = data == ord("\n")
+    comma = data == ord(",")
+    separator = newline | comma | (data == ord(" ")) | (data == ord("\t")) | (data == ord("\r"))
+    # Начало поля -- не разделитель после разделителя (или в начале блока)
+    field = ~separator
+    field[1:] &= separator[:-1]
+
+    # События блока по порядку; повторные переводы строки (пустые строки) отбрасываются
+    events = np.flatnonzero(field | comma | newline)
+    kinds = newline[events].view(np.int8) * _NEWLINE + comma[events].view(np.int8) * _COMMA
+    repeated = kinds == _NEWLINE
+    repeated[1:] &= kinds[:-1] == _NEWLINE
+    kinds = kinds[~repeated]
+    if len(kinds) % 4 == 3:
+        # Последняя строка без перевода строки
+        kinds = np.append(kinds, np.int8(_NEWLINE))
+
+    if len(kinds) % 4 or not np.all(kinds.reshape(-1, 4) == _LINE_PATTERN):
+        raise ValueError("Каждая строка CSV должна содержать ровно две вершины 'начало,конец'")
+
+
+def _parse_int_block(block: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    _check_int_block(block)
+    text = block.replace(b",", b" ").decode("ascii")
+    with warnings.catch_warnings():
+        # В старых версиях NumPy неполный разбор -- DeprecationWarning, в новых -- ValueError
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            values = np.fromstring(text, dtype=np.int64, sep=" ")
+        except (ValueError, DeprecationWarning) as exc:
+            raise ValueError(f"Некорректные числовые данные в CSV: {exc}") from None
+    if len(values) % 2:
+        raise ValueError("Нечётное число значений в блоке CSV: ожидаются пары 'начало,конец'")
+    if len(values) and (values.min() < _INT32_MIN or values.max() > _INT32_MAX):
+        raise ValueError("Номер вершины не помещается в int32")
+    values = values.astype(np.int32)
+    return values[0::2], values[1::2]
+
+
+def _parse_label_block(block: bytes, table: VertexTable) -> Tuple[np.ndarray, np.ndarray]:
+    lines = [line for line in block.decode("utf-8").splitlines() if line.strip()]
+    tokens = ",".join(lines).split(",")
+    if len(tokens) != 2 * len(lines) or any(line.count(",") != 1 for line in lines):
+        raise ValueError("Каждая строка CSV должна содержать ровно две вершины")
+    codes = np.fromiter(
+        (table.intern(token.strip()) for token in tokens), dtype=np.int32, count=len(tokens)
+    )
+    return codes[0::2], codes[1::2]
+
+
+def iter_edge_chunks(
+    blocks: Iterable[bytes],
+    vertex_table: Optional[VertexTable] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Разбирает поток байтовых блоков CSV и выдаёт рёбра порциями.
+
+    Args:
+        blocks: произвольно нарезанные куски CSV (границы блоков могут
+            проходить посреди строки)
+        vertex_table: если задана, метки вершин интернируются в неё,
+            иначе метки разбираются как целые числа
+
+    Yields:
+        (src, dst) -- массивы int32 одинаковой длины
+    """
+    for block in _split_blocks(blocks):
+        if vertex_table is None:
+            src, dst = _parse_int_block(block)
+        else:
+            src, dst = _parse_label_block(block, vertex_table)
+        if len(src):
+            yield src, dst
+
+
+def _iter_file_blocks(path: str, chunk_size: int, use_mmap: bool) -> Iterator[bytes]:
+    with open(path, "rb") as fh:
+        if use_mmap:
+            try:
+                view = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # пустой файл нельзя отобразить в память
+                return
+            with view:
+                for offset in range(0, len(view), chunk_size):
+                    yield view[offset:offset + chunk_size]
+        else:
+            while block := fh.read(chunk_size):
+                yield block
+
+
+def _iter_string_blocks(text: Union[str, bytes], chunk_size: int) -> Iterator[bytes]:
+    for offset in range(0, len(text), chunk_size):
+        block = text[offset:offset + chunk_size]
+        yield block.encode("utf-8") if isinstance(block, str) else block
+
+
+def _collect(chunks: Iterator[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    sources, targets = [], []
+    for src, dst in chunks:
+        sources.append(src)
+        targets.append(dst)
+    if not sources:
+        empty = np.empty(0, dtype=np.int32)
+        return empty, empty.copy()
+    return np.concatenate(sources), np.concatenate(targets)
+
+
+def load_edges_from_file(
+    path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    use_mmap: bool = False,
+    vertex_table: Optional[VertexTable] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Читает CSV-файл рёбер блоками по chunk_size байт (или через mmap)"""
+    blocks = _iter_file_blocks(path, chunk_size, use_mmap)
+    return _collect(iter_edge_chunks(blocks, vertex_table))
+
+
+def load_edges_from_string(
+    text: Union[str, bytes],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    vertex_table: Optional[VertexTable] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Разбирает CSV-строку рёбер блоками по chunk_size символов"""
+    blocks = _iter_string_blocks(text, chunk_size)
+    return _collect(iter_edge_chunks(blocks, vertex_table))
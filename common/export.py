@@ -0,0 +1,150 @@
+"""
+Потоковая запись отношений r1-r5 task1 на диск.
+
+Строки матриц строятся блоками (TreeRelation.block_indices) и сразу
+дописываются в файлы .npy, поэтому в памяти одновременно находятся только
+массивы дерева и один блок, а не n x n списков. Блок ограничен и числом строк
+(block_rows), и числом единиц (max_entries): по row_counts границы блоков
+известны заранее, так что строки звезды или длинной цепочки, где единиц почти
+n, не раздувают блок. Заголовок .npy записывается до данных: форма каждого
+файла известна заранее.
+
+Форматы:
+    "packed" -- r{k}.npy, битовая матрица n x ceil(n / 8) типа uint8 в
+                раскладке np.packbits (n^2 / 8 байт на отношение);
+    "csr"    -- r{k}.indptr.npy (n + 1) и r{k}.indices.npy (число единиц):
+                единицы строки i -- indices[indptr[i]:indptr[i + 1]] по
+                возрастанию; размер пропорционален числу единиц.
+
+Рядом пишутся labels.npy (метка вершины для каждой строки и столбца) и
+manifest.json с форматом, размерами и именами файлов. Файлы открываются через
+np.load(path, mmap_mode="r").
+"""
+
+import json
+import os
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from common.relations import TreeRelation
+
+FORMATS = ("packed", "csr")
+NAMES = ("r1", "r2", "r3", "r4", "r5")
+DEFAULT_BLOCK_BYTES = 32 << 20     # 32 МиБ на блок строк bool перед упаковкой
+DEFAULT_MAX_ENTRIES = 1 << 21      # единиц в блоке (номера столбцов и строк)
+
+ProgressCallback = Callable[[str, int, int], None]
+
+
+def default_block_rows(n: int, block_bytes: int = DEFAULT_BLOCK_BYTES) -> int:
+    """Число строк в блоке, чтобы блок bool n столбцов занимал не больше block_bytes"""
+    return max(1, block_bytes // max(1, n))
+
+
+def row_blocks(counts: np.ndarray, block_rows: int, max_entries: int = DEFAULT_MAX_ENTRIES):
+    """Границы блоков (start, stop): не больше block_rows строк и max_entries единиц (кроме одиночных строк)"""
+    n = len(counts)
+    ends = np.cumsum(counts)
+    start = 0
+    while start < n:
+        base = int(ends[start - 1]) if start else 0
+        fits = int(np.searchsorted(ends, base + max_entries, side="right"))
+        stop = max(start + 1, min(n, start + block_rows, fits))
+        yield start, stop
+        start = stop
+
+
+def _open_npy(path: str, dtype, shape: tuple):
+    fh = open(path, "wb")
+    np.lib.format.write_array_header_1_0(fh, {
+        "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        "fortran_order": False,
+        "shape": shape,
+    })
+    return fh
+
+
+def write_relation(relation: TreeRelation, prefix: str, fmt: str = "packed",
+                   block_rows: Optional[int] = None, progress: Optional[ProgressCallback] = None,
+                   name: str = "", max_entries: int = DEFAULT_MAX_ENTRIES) -> Dict[str, str]:
+    """
+    Записывает одно отношение в файлы с путём prefix + расширение.
+
+    Аргументы:
+        relation: отношение (TreeRelation)
+        prefix: путь без расширения
+        fmt: "packed" или "csr"
+        block_rows: строк в блоке (по умолчанию -- default_block_rows)
+        max_entries: единиц в блоке
+        progress: вызывается после каждого блока как progress(name, строк записано, n)
+
+    Возвращает:
+        Имена записанных файлов по ролям ("data" или "indptr" и "indices")
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt!r}, ожидается один из {FORMATS}")
+    n = relation.n
+    block_rows = block_rows or default_block_rows(n)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(relation.row_counts(), out=indptr[1:])
+    blocks = row_blocks(np.diff(indptr), block_rows, max_entries)
+
+    if fmt == "packed":
+        files = {"data": prefix + ".npy"}
+        with _open_npy(files["data"], np.uint8, (n, (n + 7) // 8)) as fh:
+            for start, stop in blocks:
+                counts, cols = relation.block_indices(start, stop)
+                dense = np.zeros((stop - start, n), dtype=bool)
+                dense[np.repeat(np.arange(stop - start), counts), cols] = True
+                fh.write(np.packbits(dense, axis=1).tobytes())
+                if progress is not None:
+                    progress(name, stop, n)
+        return files
+
+    files = {"indptr": prefix + ".indptr.npy", "indices": prefix + ".indices.npy"}
+    np.save(files["indptr"], indptr)
+    nnz = int(indptr[-1])
+    dtype = np.int32 if n <= np.iinfo(np.int32).max else np.int64
+    with _open_npy(files["indices"], dtype, (nnz,)) as fh:
+        for start, stop in blocks:
+            counts, cols = relation.block_indices(start, stop)
+            if not np.array_equal(counts, indptr[start + 1:stop + 1] - indptr[start:stop]):
+                raise RuntimeError(f"{name}: число единиц в строках {start}..{stop - 1} не совпало с row_counts")
+            fh.write(cols.astype(dtype).tobytes())
+            if progress is not None:
+                progress(name, stop, n)
+    return files
+
+
+def write_relations(relations: Sequence[TreeRelation], directory: str, fmt: str = "packed",
+                    block_rows: Optional[int] = None, progress: Optional[ProgressCallback] = None,
+                    labels: Optional[np.ndarray] = None, names: Sequence[str] = NAMES,
+                    max_entries: int = DEFAULT_MAX_ENTRIES) -> dict:
+    """
+    Записывает отношения в каталог directory и возвращает содержимое manifest.json.
+
+    labels -- метки вершин (по умолчанию берутся из дерева первого отношения).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt!r}, ожидается один из {FORMATS}")
+    os.makedirs(directory, exist_ok=True)
+    n = relations[0].n if relations else 0
+    labels = relations[0].tree.labels if labels is None and relations else labels
+    block_rows = block_rows or default_block_rows(n)
+
+    manifest = {"format": fmt, "n": n, "block_rows": block_rows, "labels": None, "relations": {}}
+    if labels is not None:
+        labels = np.asarray(labels)
+        if labels.dtype == object:
+            labels = labels.astype(str)
+        np.save(os.path.join(directory, "labels.npy"), labels)
+        manifest["labels"] = "labels.npy"
+
+    for name, relation in zip(names, relations):
+        files = write_relation(relation, os.path.join(directory, name), fmt, block_rows, progress, name, max_entries)
+        manifest["relations"][name] = {role: os.path.basename(path) for role, path in files.items()}
+
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=2)
+    return manifest
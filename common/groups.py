@@ -0,0 +1,89 @@
+"""
+Разбиение вершин на группы по ключу (например, по родителю) для
+отношения соподчинения r5.
+
+r5 внутри группы -- полный блок G x G без диагонали, поэтому хранится только
+перестановка вершин, упорядоченная по группам, и границы групп. Для энтропии
+достаточно числа "соседей" по группе (размер группы - 1), пары при этом не
+строятся вовсе.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class GroupPartition:
+    """
+    Вершины 0..n-1, сгруппированные по ключу.
+
+    Аргументы:
+        keys: ключ группы для каждой вершины
+        active: маска вершин, участвующих в разбиении (например, без корней
+            при группировке по родителю); неактивные вершины ни с кем не связаны
+
+    Атрибуты:
+        members: активные вершины, упорядоченные по группам
+        group_ptr: вершины группы g -- members[group_ptr[g]:group_ptr[g + 1]]
+        group_of: номер группы вершины (-1 для неактивных)
+    """
+
+    def __init__(self, keys: np.ndarray, active: Optional[np.ndarray] = None):
+        keys = np.asarray(keys)
+        self.n = len(keys)
+        nodes = np.arange(self.n) if active is None else np.flatnonzero(active)
+
+        # Стабильная сортировка: внутри группы вершины по возрастанию индекса
+        by_key = nodes[np.argsort(keys[nodes], kind="stable")]
+        _, starts, inverse, sizes = np.unique(
+            keys[by_key], return_index=True, return_inverse=True, return_counts=True
+        )
+        self.members = by_key
+        self.group_ptr = np.append(starts, len(by_key)).astype(np.int64)
+        self.sizes = sizes.astype(np.int64)
+        self.group_of = np.full(self.n, -1, dtype=np.int64)
+        self.group_of[by_key] = inverse.reshape(-1)
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def group(self, g: int) -> np.ndarray:
+        return self.members[self.group_ptr[g]:self.group_ptr[g + 1]]
+
+    def peer_counts(self) -> np.ndarray:
+        """Число других вершин в группе каждой вершины (размер группы - 1)"""
+        counts = np.zeros(self.n, dtype=np.int64)
+        active = self.group_of >= 0
+        counts[active] = self.sizes[self.group_of[active]] - 1
+        return counts
+
+    def peers(self, v: int) -> np.ndarray:
+        """Другие вершины группы v по возрастанию индекса"""
+        g = self.group_of[v]
+        if g < 0:
+            return np.empty(0, dtype=np.int64)
+        members = self.group(g)
+        return members[members != v]
+
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Все упорядоченные пары (x, y), x != y, из одной группы -- без циклов Python"""
+        reps = self.sizes[self.group_of[self.members]]
+        rows = np.repeat(self.members, reps)
+        start = np.repeat(self.group_ptr[self.group_of[self.members]], reps)
+        offset = np.arange(len(rows)) - np.repeat(np.cumsum(reps) - reps, reps)
+        cols = self.members[start + offset]
+        distinct = rows != cols
+        return rows[distinct], cols[distinct]
+
+    def to_dense(self) -> np.ndarray:
+        matrix = np.zeros((self.n, self.n), dtype=bool)
+        matrix[self.pairs()] = True
+        return matrix
+
+    def to_packed(self) -> np.ndarray:
+        """Битовая матрица n x ceil(n / 8) в раскладке np.packbits"""
+        rows, cols = self.pairs()
+        packed = np.zeros((self.n, (self.n + 7) // 8), dtype=np.uint8)
+        masks = np.left_shift(1, 7 - (cols & 7)).astype(np.uint8)
+        np.bitwise_or.at(packed, (rows, cols >> 3), masks)
+        return packed
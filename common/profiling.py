@@ -0,0 +1,161 @@
+"""
+Необязательные замеры этапов task1-task4.
+
+Точки входа размечены блоками
+
+    with stage("task3", "kernel", objects=n) as st:
+        ...
+        st.note(pairs=len(kernel))
+
+Пока ни один слушатель не подключён, stage() возвращает общий пустой объект,
+и разметка стоит один вызов функции. Слушатель -- любая функция, получающая
+StageRecord; Profiler собирает записи в список на время блока with:
+
+    with Profiler() as prof:
+        task3.main(a, b)
+    prof.summary()   # суммарное время по этапам
+    prof.to_json()   # все записи
+
+Для каждого этапа записываются длительность, прирост числа выделенных блоков
+памяти интерпретатора (sys.getallocatedblocks), а при включённом tracemalloc
+ещё и прирост и пик отслеживаемой памяти, плюс размеры входа из аргументов.
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+_listeners: List[Callable[["StageRecord"], None]] = []
+
+
+class StageRecord(NamedTuple):
+    task: str
+    stage: str
+    seconds: float
+    blocks: int                   # прирост числа выделенных блоков памяти
+    traced_bytes: Optional[int]   # прирост памяти по tracemalloc (если включён)
+    traced_peak: Optional[int]    # пик tracemalloc за этап (если включён)
+    sizes: Dict[str, int]
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+def add_listener(listener: Callable[[StageRecord], None]) -> None:
+    _listeners.append(listener)
+
+
+def remove_listener(listener: Callable[[StageRecord], None]) -> None:
+    _listeners.remove(listener)
+
+
+def enabled() -> bool:
+    return bool(_listeners)
+
+
+class _NullStage:
+    """Этап при выключенных замерах: ничего не делает"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def note(self, **sizes) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, task: str, name: str, sizes: Dict[str, int]):
+        self.task = task
+        self.name = name
+        self.sizes = sizes
+
+    def note(self, **sizes) -> None:
+        """Дополнить размеры, известные только после выполнения этапа"""
+        self.sizes.update(sizes)
+
+    def __enter__(self):
+        self._tracing = tracemalloc.is_tracing()
+        if self._tracing:
+            self._traced_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._blocks = sys.getallocatedblocks()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        seconds = time.perf_counter() - self._start
+        blocks = sys.getallocatedblocks() - self._blocks
+        traced_bytes = traced_peak = None
+        if self._tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            traced_bytes, traced_peak = current - self._traced_start, peak - self._traced_start
+        record = StageRecord(self.task, self.name, seconds, blocks, traced_bytes, traced_peak, self.sizes)
+        for listener in list(_listeners):
+            listener(record)
+        return False
+
+
+def stage(task: str, name: str, **sizes):
+    """Блок with, замеряемый только при подключённых слушателях"""
+    if not _listeners:
+        return _NULL_STAGE
+    return _Stage(task, name, sizes)
+
+
+class Profiler:
+    """
+    Слушатель, собирающий записи этапов внутри блока with.
+
+    Аргументы:
+        callback: дополнительно вызывается для каждой записи
+        trace_memory: включить tracemalloc на время блока (заметно замедляет)
+    """
+
+    def __init__(self, callback: Optional[Callable[[StageRecord], None]] = None, trace_memory: bool = False):
+        self.records: List[StageRecord] = []
+        self.callback = callback
+        self.trace_memory = trace_memory
+        self._started_tracing = False
+
+    def __call__(self, record: StageRecord) -> None:
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def __enter__(self) -> "Profiler":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        add_listener(self)
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        remove_listener(self)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    def to_dicts(self) -> List[dict]:
+        return [record.to_dict() for record in self.records]
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dicts(), ensure_ascii=False, **kwargs)
+
+    def summary(self) -> Dict[str, dict]:
+        """Число вызовов, суммарное и наибольшее время по "task/stage" в порядке первого появления"""
+        totals: Dict[str, dict] = {}
+        for record in self.records:
+            entry = totals.setdefault(f"{record.task}/{record.stage}", {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += record.seconds
+            entry["max_seconds"] = max(entry["max_seconds"], record.seconds)
+        return totals
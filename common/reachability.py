@@ -0,0 +1,250 @@
+"""
+Индекс достижимости для ориентированного ациклического графа (task0).
+
+Один итеративный обход в глубину даёт времена входа pre и выхода post
+(убывание post -- топологический порядок) и метку low[v] -- наименьший post
+среди вершин, достижимых из v. Для большинства пар ответ получается за O(1):
+
+    v достижима из u  =>  low[u] <= post[v] < post[u]           (иначе -- нет)
+    pre[u] < pre[v] и post[v] < post[u]  =>  v -- потомок в дереве обхода (да)
+
+Оставшиеся пары проверяются по одному из остаточных индексов:
+
+    "bitset" -- транзитивное замыкание, строка на вершину, упакованная в uint64
+                (n * ceil(n / 64) * 8 байт);
+    "chains" -- покрытие графа цепями: для вершины и цепи хранится наименьшая
+                позиция цепи, достижимая из вершины (n * k * 4 байт, k -- число цепей);
+    "search" -- без остаточного индекса: обход в глубину от u с отсечением по
+                тем же меткам (для графов, где оба индекса не помещаются в память).
+
+По умолчанию выбирается меньший из "bitset" и "chains", если он не больше
+max_bytes, иначе "search".
+"""
+
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+METHODS = ("auto", "bitset", "chains", "search")
+DEFAULT_MAX_BYTES = 1 << 30  # 1 ГиБ
+
+
+def _dfs_labels(row_ptr: List[int], col_idx: List[int], n: int) -> Tuple[List[int], List[int]]:
+    """Времена входа и выхода обхода в глубину по всем вершинам; ValueError при цикле"""
+    pre, post = [-1] * n, [-1] * n
+    clock_in = clock_out = 0
+    for root in range(n):
+        if pre[root] >= 0:
+            continue
+        pre[root] = clock_in
+        clock_in += 1
+        stack = [(root, row_ptr[root])]
+        while stack:
+            v, i = stack[-1]
+            if i < row_ptr[v + 1]:
+                stack[-1] = (v, i + 1)
+                w = col_idx[i]
+                if pre[w] < 0:
+                    pre[w] = clock_in
+                    clock_in += 1
+                    stack.append((w, row_ptr[w]))
+                elif post[w] < 0:
+                    raise ValueError("Граф содержит цикл: индекс достижимости строится только для DAG")
+            else:
+                stack.pop()
+                post[v] = clock_out
+                clock_out += 1
+    return pre, post
+
+
+def _chain_cover(parent_ptr: List[int], parent_idx: List[int], order: List[int], n: int):
+    """Жадное покрытие цепями в топологическом порядке: вершина продолжает цепь родителя, если он её хвост"""
+    chain, position = [0] * n, [0] * n
+    tails: List[int] = []
+    for v in order:
+        for i in range(parent_ptr[v], parent_ptr[v + 1]):
+            u = parent_idx[i]
+            c = chain[u]
+            if tails[c] == u:
+                chain[v], position[v] = c, position[u] + 1
+                tails[c] = v
+                break
+        else:
+            chain[v] = len(tails)
+            tails.append(v)
+    return np.array(chain, dtype=np.int64), np.array(position, dtype=np.int64), len(tails)
+
+
+class ReachabilityIndex:
+    """
+    Индекс достижимости DAG, заданного в формате CSR.
+
+    Аргументы:
+        row_ptr, col_idx: дети вершины i -- col_idx[row_ptr[i]:row_ptr[i + 1]]
+        n: число вершин
+        method: "auto", "bitset", "chains" или "search"
+        max_bytes: предел размера остаточного индекса для "auto"
+        offset: номер первой вершины в запросах (в task0 вершины нумеруются с 1)
+
+    Вершина считается достижимой из самой себя (путь нулевой длины).
+    """
+
+    def __init__(self, row_ptr: np.ndarray, col_idx: np.ndarray, n: int, method: str = "auto",
+                 max_bytes: int = DEFAULT_MAX_BYTES, offset: int = 0):
+        if method not in METHODS:
+            raise ValueError(f"Неизвестный метод: {method!r}, ожидается один из {METHODS}")
+        start = time.perf_counter()
+        self.n = n
+        self.offset = offset
+        self.row_ptr = np.asarray(row_ptr, dtype=np.int64)
+        self.col_idx = np.asarray(col_idx, dtype=np.int64)
+        self.m = len(self.col_idx)
+        ptr, kids = self.row_ptr.tolist(), self.col_idx.tolist()
+
+        pre, post = _dfs_labels(ptr, kids, n)
+        self.pre = np.array(pre, dtype=np.int64)
+        self.post = np.array(post, dtype=np.int64)
+        # Обратный топологический порядок -- по возрастанию post
+        self._reverse_order = np.empty(n, dtype=np.int64)
+        self._reverse_order[self.post] = np.arange(n)
+
+        low = post[:]
+        for v in self._reverse_order.tolist():
+            for i in range(ptr[v], ptr[v + 1]):
+                if low[kids[i]] < low[v]:
+                    low[v] = low[kids[i]]
+        self.low = np.array(low, dtype=np.int64)
+
+        self.chains = 0
+        if method in ("auto", "chains"):
+            by_child = np.argsort(self.col_idx, kind="stable")
+            parent_ptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.col_idx, minlength=n), out=parent_ptr[1:])
+            parent_idx = np.repeat(np.arange(n), np.diff(self.row_ptr))[by_child]
+            self.chain, self.chain_pos, self.chains = _chain_cover(
+                parent_ptr.tolist(), parent_idx.tolist(), self._reverse_order[::-1].tolist(), n
+            )
+        if method == "auto":
+            bitset_bytes = n * ((n + 63) // 64) * 8
+            chains_bytes = n * self.chains * 4
+            method = "bitset" if bitset_bytes <= chains_bytes else "chains"
+            if min(bitset_bytes, chains_bytes) > max_bytes:
+                method = "search"
+        if method != "chains" and self.chains:
+            del self.chain, self.chain_pos
+
+        self.method = method
+        if method == "bitset":
+            self._build_bitset()
+        elif method == "chains":
+            self._build_chains()
+        self.build_seconds = time.perf_counter() - start
+
+    def _build_bitset(self) -> None:
+        n, words = self.n, (self.n + 63) // 64
+        self.closure = np.zeros((n, words), dtype=np.uint64)
+        ptr = self.row_ptr
+        one = np.uint64(1)
+        for v in self._reverse_order.tolist():
+            kids = self.col_idx[ptr[v]:ptr[v + 1]]
+            if not len(kids):
+                continue
+            row = np.bitwise_or.reduce(self.closure[kids], axis=0)
+            np.bitwise_or.at(row, kids >> 6, np.left_shift(one, (kids & 63).astype(np.uint64)))
+            self.closure[v] = row
+
+    def _build_chains(self) -> None:
+        # reach[v, c] -- наименьшая позиция цепи c, достижимая из v строго по рёбрам
+        unreachable = np.iinfo(np.int32).max
+        self.reach = np.full((self.n, self.chains), unreachable, dtype=np.int32)
+        ptr = self.row_ptr
+        for v in self._reverse_order.tolist():
+            kids = self.col_idx[ptr[v]:ptr[v + 1]]
+            if not len(kids):
+                continue
+            row = np.minimum.reduce(self.reach[kids], axis=0)
+            np.minimum.at(row, self.chain[kids], self.chain_pos[kids].astype(np.int32))
+            self.reach[v] = row
+
+    @property
+    def nbytes(self) -> int:
+        """Размер индекса в байтах (все массивы, включая CSR графа)"""
+        names = ("row_ptr", "col_idx", "pre", "post", "low", "_reverse_order",
+                 "chain", "chain_pos", "closure", "reach")
+        return sum(getattr(self, name).nbytes for name in names if hasattr(self, name))
+
+    def stats(self) -> dict:
+        return {
+            "method": self.method,
+            "n": self.n,
+            "m": self.m,
+            "chains": self.chains,
+            "nbytes": self.nbytes,
+            "build_seconds": self.build_seconds,
+        }
+
+    def _residual(self, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+        if self.method == "bitset":
+            words = self.closure[u, v >> 6]
+            return ((words >> (v & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+        if self.method == "chains":
+            return self.reach[u, self.chain[v]] <= self.chain_pos[v]
+        return np.array([self._search(a, b) for a, b in zip(u.tolist(), v.tolist())], dtype=bool)
+
+    def _search(self, u: int, v: int) -> bool:
+        ptr, kids = self.row_ptr, self.col_idx
+        pre, post, low = self.pre, self.post, self.low
+        target_post, target_pre = post[v], pre[v]
+        seen = {u}
+        stack = [u]
+        while stack:
+            x = stack.pop()
+            for w in kids[ptr[x]:ptr[x + 1]].tolist():
+                if w == v:
+                    return True
+                if w in seen or not (low[w] <= target_post < post[w]):
+                    continue
+                if pre[w] < target_pre and target_post < post[w]:
+                    return True
+                seen.add(w)
+                stack.append(w)
+        return False
+
+    def reachable_many(self, us, vs) -> np.ndarray:
+        """Поэлементно: достижима ли vs[i] из us[i]"""
+        u = np.asarray(us, dtype=np.int64) - self.offset
+        v = np.asarray(vs, dtype=np.int64) - self.offset
+        u, v = (np.array(a) for a in np.broadcast_arrays(u, v))
+        if u.size and (min(u.min(), v.min()) < 0 or max(u.max(), v.max()) >= self.n):
+            raise IndexError("Номер вершины вне графа")
+
+        post_v = self.post[v]
+        result = np.equal(u, v, out=np.empty(u.shape, dtype=bool))
+        # Необходимое условие достижимости: post[v] внутри [low[u], post[u])
+        maybe = ~result & (self.low[u] <= post_v) & (post_v < self.post[u])
+        # Достаточное условие: v -- потомок u в дереве обхода
+        tree = maybe & (self.pre[u] < self.pre[v])
+        result |= tree
+        rest = maybe & ~tree
+        if rest.any():
+            result[rest] = self._residual(u[rest], v[rest])
+        return result
+
+    def reachable(self, u: int, v: int) -> bool:
+        """Достижима ли вершина v из u"""
+        u, v = int(u) - self.offset, int(v) - self.offset
+        if not (0 <= u < self.n and 0 <= v < self.n):
+            raise IndexError("Номер вершины вне графа")
+        if u == v:
+            return True
+        post_v = self.post[v]
+        if not (self.low[u] <= post_v < self.post[u]):
+            return False
+        if self.pre[u] < self.pre[v]:
+            return True
+        if self.method == "bitset":
+            return bool((int(self.closure[u, v >> 6]) >> (v & 63)) & 1)
+        if self.method == "chains":
+            return bool(self.reach[u, self.chain[v]] <= self.chain_pos[v])
+        return self._search(u, v)
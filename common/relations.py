@@ -0,0 +1,194 @@
+"""
+Ленивые n x n предикаты на дереве (отношения r1-r5 из task1).
+
+Ни одна матрица не хранится целиком: ячейка r[i][j] и строка r[i]
+вычисляются по запросу из массива родителей и интервалов эйлерова обхода
+TreeIndex. Отношение и его транспонированное (r1/r2, r3/r4) -- два
+представления над одним и тем же индексом дерева.
+"""
+
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from common.tree import TreeIndex
+
+CHILD = "child"        # x -- родитель y (r1)
+INDIRECT = "indirect"  # x -- предок y, но не родитель (r3)
+SIBLING = "sibling"    # x и y -- разные дети одного родителя (r5)
+
+KINDS = (CHILD, INDIRECT, SIBLING)
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Склеенные диапазоны [starts[k], starts[k] + counts[k])"""
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+
+
+class RelationRow:
+    """Строка ленивой матрицы: r[i][j], итерация по bool, len"""
+
+    def __init__(self, relation: "TreeRelation", i: int):
+        self.relation = relation
+        self.i = i
+
+    def __getitem__(self, j: int) -> bool:
+        return self.relation.cell(self.i, j)
+
+    def __len__(self) -> int:
+        return self.relation.n
+
+    def __iter__(self) -> Iterator[bool]:
+        return iter(self.to_list())
+
+    def indices(self) -> np.ndarray:
+        """Номера столбцов, в которых предикат истинен"""
+        return self.relation.row_indices(self.i)
+
+    def to_list(self) -> List[bool]:
+        row = np.zeros(self.relation.n, dtype=bool)
+        row[self.indices()] = True
+        return row.tolist()
+
+
+class TreeRelation:
+    """
+    Ленивое представление предиката на дереве.
+
+    Аргументы:
+        tree: TreeIndex - индекс дерева (общий для всех отношений)
+        kind: str - один из CHILD, INDIRECT, SIBLING
+        transposed: bool - представление транспонированного отношения
+    """
+
+    def __init__(self, tree: TreeIndex, kind: str, transposed: bool = False):
+        if kind not in KINDS:
+            raise ValueError(f"Неизвестный тип отношения: {kind!r}")
+        self.tree = tree
+        self.kind = kind
+        self.transposed = transposed
+        self.n = tree.n
+
+    @property
+    def T(self) -> "TreeRelation":
+        return TreeRelation(self.tree, self.kind, not self.transposed)
+
+    def cell(self, i: int, j: int) -> bool:
+        if self.transposed:
+            i, j = j, i
+        parent = self.tree.parent
+        if self.kind == CHILD:
+            return bool(parent[j] == i)
+        if self.kind == INDIRECT:
+            return bool(self.tree.is_indirect_ancestor(i, j))
+        return bool(i != j and parent[i] >= 0 and parent[i] == parent[j])
+
+    def row_indices(self, i: int) -> np.ndarray:
+        tree = self.tree
+        p = tree.parent[i]
+        if self.kind == CHILD:
+            if self.transposed:
+                return np.array([p] if p >= 0 else [], dtype=np.int64)
+            return np.sort(tree.children(i))
+        if self.kind == INDIRECT:
+            if self.transposed:
+                # Предки i без родителя: подъём по родителям за O(глубины)
+                ancestors = []
+                up = tree.parent[p] if p >= 0 else -1
+                while up >= 0:
+                    ancestors.append(up)
+                    up = tree.parent[up]
+                return np.sort(np.array(ancestors, dtype=np.int64))
+            return np.sort(tree.indirect_descendants(i))
+        return tree.sibling_groups().peers(i)
+
+    def row_counts(self) -> np.ndarray:
+        """Число единиц в каждой строке -- без построения строк"""
+        tree = self.tree
+        if self.kind == SIBLING:
+            return tree.sibling_groups().peer_counts()
+        if self.kind == CHILD:
+            return (tree.parent >= 0).astype(np.int64) if self.transposed else tree.child_count()
+        if self.transposed:
+            # Предки без родителя
+            return np.maximum(tree.depth - 1, 0)
+        return tree.size - 1 - tree.child_count()
+
+    def block_indices(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Строки start..stop-1 в формате CSR без циклов по строкам.
+
+        Возвращает:
+            counts - число единиц в каждой строке блока
+            cols - столбцы единиц, строка за строкой, по возрастанию внутри строки
+        """
+        tree = self.tree
+        parent = tree.parent
+        rows = np.arange(start, stop, dtype=np.int64)
+        if self.kind == CHILD and not self.transposed:
+            counts = tree.child_count()[rows]
+            owner = np.repeat(rows, counts)
+            cols = tree.child_idx[_ranges(tree.child_ptr[rows], counts)]
+        elif self.kind == CHILD:
+            # Не больше одной единицы в строке -- родитель
+            has_parent = parent[rows] >= 0
+            return has_parent.astype(np.int64), parent[rows[has_parent]]
+        elif self.kind == INDIRECT and not self.transposed:
+            # Потомки -- непрерывный срез прямого порядка обхода
+            counts = tree.size[rows] - 1
+            owner = np.repeat(rows, counts)
+            cols = tree.order[_ranges(tree.tin[rows] + 1, counts)]
+            keep = parent[cols] != owner
+            owner, cols = owner[keep], cols[keep]
+        elif self.kind == INDIRECT:
+            # Предки на глубинах 0..depth-2 -- по одному двоичному поиску на
+            # единицу, без подъёма по уровням дерева
+            counts = np.maximum(tree.depth[rows] - 1, 0)
+            owner = np.repeat(rows, counts)
+            cols = tree.ancestor_at_depth(owner, _ranges(np.zeros_like(counts), counts))
+        else:
+            groups = tree.sibling_groups()
+            group = groups.group_of[rows]
+            active = group >= 0
+            counts = groups.sizes[group[active]]
+            owner = np.repeat(rows[active], counts)
+            cols = groups.members[_ranges(groups.group_ptr[group[active]], counts)]
+            # Вершины группы уже по возрастанию: сортировка не нужна
+            keep = cols != owner
+            return np.bincount(owner[keep] - start, minlength=stop - start), cols[keep]
+
+        # Один ключ int64 вместо lexsort по двум массивам: сортировка в разы быстрее
+        key = (owner - start) * self.n + cols
+        key.sort()
+        return np.bincount(owner - start, minlength=stop - start), key % self.n
+
+    def __getitem__(self, i: int) -> RelationRow:
+        if not -self.n <= i < self.n:
+            raise IndexError(i)
+        return RelationRow(self, i % self.n)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __iter__(self) -> Iterator[RelationRow]:
+        for i in range(self.n):
+            yield RelationRow(self, i)
+
+    def to_dense(self) -> List[List[bool]]:
+        """Полная матрица в виде списка списков bool"""
+        if self.kind == SIBLING:
+            # Блоки G x G по группам родителей; отношение симметрично
+            return self.tree.sibling_groups().to_dense().tolist()
+        matrix = np.zeros((self.n, self.n), dtype=bool)
+        base = TreeRelation(self.tree, self.kind)
+        for i in range(self.n):
+            matrix[i, base.row_indices(i)] = True
+        return (matrix.T if self.transposed else matrix).tolist()
+
+
+def tree_relations(tree: TreeIndex):
+    """Пять отношений task1: (r1, r2, r3, r4, r5)"""
+    r1 = TreeRelation(tree, CHILD)
+    r3 = TreeRelation(tree, INDIRECT)
+    return r1, r1.T, r3, r3.T, TreeRelation(tree, SIBLING)
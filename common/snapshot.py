@@ -0,0 +1,168 @@
+"""
+Двоичный снимок графа для повторных запусков task0, task1 и task2.
+
+CSV разбирается один раз, после чего в файл записываются таблица вершин
+(отсортированные метки) и две CSR-структуры в нумерации по возрастанию меток:
+
+    child_ptr, child_idx    -- дети (исходящие рёбра) в порядке входных данных
+    parent_ptr, parent_idx  -- родители (входящие рёбра) в порядке входных данных
+    parent                  -- родитель каждой вершины (-1 у корней); только
+                               если у каждой вершины не больше одного родителя
+
+Файл: 8 байт сигнатуры, длина заголовка (uint64 little-endian), заголовок JSON
+с типами, формами и смещениями массивов, затем сами массивы, выровненные по
+64 байтам. Массивы открываются через np.memmap без копирования: загрузка не
+зависит от числа рёбер, а процессы, открывшие один снимок, разделяют
+страницы кэша файловой системы.
+
+    python -m common.snapshot graph.csv graph.snap
+"""
+
+import json
+import os
+import sys
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from common.edges import DEFAULT_CHUNK_SIZE, load_edges_from_file
+from common.tree import _encode_labels
+
+MAGIC = b"GRSNAP\x00\x01"
+VERSION = 1
+_ALIGN = 64
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Стабильная сортировка сохраняет порядок рёбер из входных данных
+    order = np.argsort(keys, kind="stable")
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=ptr[1:])
+    return ptr, values[order]
+
+
+def build_arrays(src: np.ndarray, dst: np.ndarray) -> Dict[str, np.ndarray]:
+    """Массивы снимка по спискам начал и концов рёбер"""
+    m = len(src)
+    labels, codes = _encode_labels(np.concatenate((src, dst)))
+    n = len(labels)
+    par = codes[:m].astype(np.int64)
+    child = codes[m:].astype(np.int64)
+
+    arrays = {"labels": labels}
+    arrays["child_ptr"], arrays["child_idx"] = _csr(par, child, n)
+    arrays["parent_ptr"], arrays["parent_idx"] = _csr(child, par, n)
+    if m == 0 or np.diff(arrays["parent_ptr"]).max() <= 1:
+        parent = np.full(n, -1, dtype=np.int64)
+        parent[child] = par
+        arrays["parent"] = parent
+    return arrays
+
+
+def write_snapshot(path: str, src: np.ndarray, dst: np.ndarray) -> None:
+    arrays = build_arrays(src, dst)
+    header = {"version": VERSION, "n": len(arrays["labels"]), "m": len(src), "arrays": {}}
+
+    relative, offset = {}, 0
+    for name, array in arrays.items():
+        relative[name] = offset
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+
+    # Смещения зависят от длины заголовка, а длина -- от смещений: начало
+    # области данных увеличивается, пока заголовок не поместится перед ним
+    data_start = 0
+    while True:
+        for name, array in arrays.items():
+            header["arrays"][name] = {
+                "dtype": array.dtype.str, "shape": list(array.shape), "offset": data_start + relative[name]
+            }
+        encoded = json.dumps(header).encode("utf-8")
+        needed = -(-(len(MAGIC) + 8 + len(encoded)) // _ALIGN) * _ALIGN
+        if needed <= data_start:
+            break
+        data_start = needed
+
+    with open(path, "wb") as fh:
+        fh.write(MAGIC)
+        fh.write(len(encoded).to_bytes(8, "little"))
+        fh.write(encoded)
+        for name, array in arrays.items():
+            fh.seek(header["arrays"][name]["offset"])
+            np.ascontiguousarray(array).tofile(fh)
+        fh.truncate(max(fh.tell(), data_start))
+
+
+def snapshot_from_csv(csv_path: str, snapshot_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """Разбирает CSV-файл рёбер один раз и сохраняет снимок"""
+    src, dst = load_edges_from_file(csv_path, chunk_size)
+    write_snapshot(snapshot_path, src, dst)
+
+
+def is_snapshot(path) -> bool:
+    if not isinstance(path, (str, os.PathLike)) or not os.path.isfile(path):
+        return False
+    with open(path, "rb") as fh:
+        return fh.read(len(MAGIC)) == MAGIC
+
+
+class GraphSnapshot:
+    """
+    Снимок графа, открытый через np.memmap (массивы только для чтения).
+
+    Атрибуты:
+        n, m: число вершин и рёбер
+        labels: отсортированные метки вершин (индекс вершины -> метка)
+        child_ptr, child_idx: дети вершины v -- child_idx[child_ptr[v]:child_ptr[v + 1]]
+        parent_ptr, parent_idx: родители вершины v в той же раскладке
+        parent: родитель каждой вершины (-1 у корней) или None, если у
+            какой-то вершины несколько родителей
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path}: не снимок графа")
+            length = int.from_bytes(fh.read(8), "little")
+            header = json.loads(fh.read(length).decode("utf-8"))
+        if header["version"] != VERSION:
+            raise ValueError(f"{path}: неподдерживаемая версия снимка {header['version']}")
+
+        self.n = header["n"]
+        self.m = header["m"]
+        arrays = {name: self._map(meta) for name, meta in header["arrays"].items()}
+        self.labels = arrays["labels"]
+        self.child_ptr = arrays["child_ptr"]
+        self.child_idx = arrays["child_idx"]
+        self.parent_ptr = arrays["parent_ptr"]
+        self.parent_idx = arrays["parent_idx"]
+        self.parent: Optional[np.ndarray] = arrays.get("parent")
+
+    def _map(self, meta: dict) -> np.ndarray:
+        dtype, shape = np.dtype(meta["dtype"]), tuple(meta["shape"])
+        if not int(np.prod(shape)):
+            # Пустой участок файла нельзя отобразить в память
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=meta["offset"], shape=shape)
+
+    def children(self, v: int) -> np.ndarray:
+        return self.child_idx[self.child_ptr[v]:self.child_ptr[v + 1]]
+
+    def parents(self, v: int) -> np.ndarray:
+        return self.parent_idx[self.parent_ptr[v]:self.parent_ptr[v + 1]]
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Метки начал и концов всех рёбер, сгруппированные по началу"""
+        sources = np.repeat(np.arange(self.n), np.diff(self.child_ptr))
+        return self.labels[sources], self.labels[self.child_idx]
+
+
+def open_snapshot(path: str) -> GraphSnapshot:
+    return GraphSnapshot(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Использование: python -m common.snapshot <graph.csv> <graph.snap>")
+        sys.exit(1)
+    snapshot_from_csv(sys.argv[1], sys.argv[2])
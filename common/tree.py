@@ -0,0 +1,300 @@
+"""
+Индекс корневого дерева на массивах NumPy.
+
+Вершины нумеруются в порядке возрастания меток (как строки/столбцы матриц в
+task1). Итеративный обход в глубину за один проход вычисляет времена входа
+tin и выхода tout (tout -- исключающая граница поддерева в прямом порядке),
+поэтому проверка "a -- предок b" сводится к сравнению интервалов за O(1):
+
+    tin[a] < tin[b] < tout[a]
+
+а все потомки вершины a -- это непрерывный срез order[tin[a] + 1:tout[a]].
+
+Если интервалы не нужны (например, для подсчёта энтропии в task2), хватает
+облегчённого RootedTree: глубины и размеры поддеревьев он получает обходом по
+уровням, где широкие уровни раскрываются векторно, а узкие -- в Python.
+"""
+
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from common.groups import GroupPartition
+
+
+# Уровни уже этого порога раскрываются циклом Python: накладные расходы
+# NumPy на вызов больше, чем работа с парой вершин (важно для длинных цепочек)
+NARROW_LEVEL = 64
+
+
+def _encode_labels(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Отсортированные уникальные метки и код (индекс) каждого элемента"""
+    if len(labels) and np.issubdtype(labels.dtype, np.integer):
+        low, high = int(labels.min()), int(labels.max())
+        if high - low <= 4 * len(labels):
+            # Плотная целочисленная нумерация: битовая карта вместо сортировки
+            present = np.zeros(high - low + 1, dtype=bool)
+            present[labels - low] = True
+            code_of = np.cumsum(present) - 1
+            return np.flatnonzero(present) + low, code_of[labels - low]
+    unique, codes = np.unique(labels, return_inverse=True)
+    return unique, codes.reshape(-1)
+
+
+def _depths(up: List[int]) -> List[int]:
+    """Глубины по массиву позиций родителей (родитель раньше ребёнка)"""
+    depth = [0] * len(up)
+    for i, p in enumerate(up):
+        if p >= 0:
+            depth[i] = depth[p] + 1
+    return depth
+
+
+def _subtree_sizes(up: List[int]) -> List[int]:
+    """Размеры поддеревьев -- обратным проходом по тому же порядку"""
+    size = [1] * len(up)
+    for i in range(len(up) - 1, -1, -1):
+        if up[i] >= 0:
+            size[up[i]] += size[i]
+    return size
+
+
+class RootedTree:
+    """
+    Корневое дерево (или лес) без обхода: массив родителей и списки детей.
+
+    Атрибуты:
+        labels: отсортированные метки вершин (индекс вершины -> метка)
+        parent: индекс родителя (-1 у корня)
+        roots, root: все корни леса и основной корень
+        child_ptr, child_idx: дети вершины v -- child_idx[child_ptr[v]:child_ptr[v + 1]]
+            в порядке появления рёбер во входных данных
+    """
+
+    def __init__(self, src: np.ndarray, dst: np.ndarray, root=None):
+        m = len(src)
+        labels, codes = _encode_labels(np.concatenate((src, dst)))
+        n = len(labels)
+        par = codes[:m].astype(np.int64)
+        child = codes[m:].astype(np.int64)
+
+        if np.any(np.bincount(child, minlength=n) > 1):
+            raise ValueError("Не дерево: у вершины больше одного родителя")
+        parent = np.full(n, -1, dtype=np.int64)
+        parent[child] = par
+
+        # Стабильная сортировка сохраняет порядок детей из входных данных
+        by_parent = np.argsort(par, kind="stable")
+        child_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(par, minlength=n), out=child_ptr[1:])
+
+        self._setup(labels, parent, child_ptr, child[by_parent], root)
+        self._build()
+
+    @classmethod
+    def from_snapshot(cls, snapshot, root=None):
+        """
+        Дерево над массивами снимка графа (common.snapshot) без разбора CSV:
+        метки, родители и списки детей используются без копирования
+        """
+        if snapshot.parent is None:
+            raise ValueError("Не дерево: у вершины больше одного родителя")
+        tree = cls.__new__(cls)
+        tree._setup(snapshot.labels, snapshot.parent, snapshot.child_ptr, snapshot.child_idx, root)
+        tree._build()
+        return tree
+
+    def _setup(self, labels: np.ndarray, parent: np.ndarray, child_ptr: np.ndarray,
+               child_idx: np.ndarray, root=None) -> None:
+        self.labels = labels
+        self.n = len(labels)
+        self.parent = parent
+        self.child_ptr = child_ptr
+        self.child_idx = child_idx
+
+        # Лес допускается: корни обходятся по возрастанию меток
+        self.roots = np.flatnonzero(self.parent < 0)
+        if not len(self.roots):
+            raise ValueError("Не дерево: нет вершины без родителя")
+        self.root = int(self.roots[0])
+        if root is not None:
+            self.root = self.index(self.labels.dtype.type(root))
+            if self.parent[self.root] >= 0:
+                raise ValueError(f"Вершина {root} не является корнем дерева")
+
+    def _build(self) -> None:
+        """Дополнительные структуры подклассов (вызывается после _setup)"""
+
+    def index(self, label) -> int:
+        """Индекс вершины по её метке"""
+        i = int(np.searchsorted(self.labels, label))
+        if i >= self.n or self.labels[i] != label:
+            raise KeyError(label)
+        return i
+
+    def children(self, v: int) -> np.ndarray:
+        return self.child_idx[self.child_ptr[v]:self.child_ptr[v + 1]]
+
+    def child_count(self) -> np.ndarray:
+        return np.diff(self.child_ptr)
+
+    def level_order(self, roots: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Обход в ширину от roots (по умолчанию -- от всех корней).
+
+        Возвращает:
+            order - вершины по уровням (родитель всегда раньше ребёнка)
+            depth - глубина каждой вершины
+        """
+        ptr, kids = self.child_ptr, self.child_idx
+        ptr_list = kids_list = None
+        frontier = np.asarray(self.roots if roots is None else roots, dtype=np.int64)
+
+        # Вершины копятся сегментами; для каждого сегмента хранятся глубина
+        # его первого уровня и размеры уровней
+        segments, start_depths, level_sizes = [], [], []
+        depth = 0
+        while len(frontier):
+            if len(frontier) >= NARROW_LEVEL:
+                frontier = np.asarray(frontier, dtype=np.int64)
+                segments.append(frontier)
+                start_depths.append(depth)
+                level_sizes.append([len(frontier)])
+                starts = ptr[frontier]
+                counts = ptr[frontier + 1] - starts
+                offsets = np.cumsum(counts) - counts
+                frontier = kids[np.repeat(starts - offsets, counts) + np.arange(counts.sum())]
+                depth += 1
+                continue
+
+            # Подряд идущие узкие уровни обходятся в чистом Python
+            if ptr_list is None:
+                ptr_list, kids_list = ptr.tolist(), kids.tolist()
+            level = frontier.tolist() if isinstance(frontier, np.ndarray) else frontier
+            run, sizes = [], []
+            start_depths.append(depth)
+            while level and len(level) < NARROW_LEVEL:
+                run.extend(level)
+                sizes.append(len(level))
+                if len(level) == 1:
+                    v = level[0]
+                    level = kids_list[ptr_list[v]:ptr_list[v + 1]]
+                else:
+                    following = []
+                    for v in level:
+                        following.extend(kids_list[ptr_list[v]:ptr_list[v + 1]])
+                    level = following
+                depth += 1
+            segments.append(np.array(run, dtype=np.int64))
+            level_sizes.append(sizes)
+            frontier = level
+
+        order = np.concatenate(segments) if segments else np.empty(0, dtype=np.int64)
+        if len(order) != self.n:
+            raise ValueError("Не дерево: часть вершин недостижима из корня")
+        depth_of = np.concatenate([
+            np.repeat(np.arange(first, first + len(sizes)), sizes)
+            for first, sizes in zip(start_depths, level_sizes)
+        ])
+        depths = np.empty(self.n, dtype=np.int64)
+        depths[order] = depth_of
+        return order, depths
+
+    def subtree_sizes(self, order: np.ndarray) -> np.ndarray:
+        """Размеры поддеревьев по любому порядку, где родитель раньше ребёнка"""
+        position = np.empty(self.n, dtype=np.int64)
+        position[order] = np.arange(self.n)
+        up = self.parent[order]
+        up[up >= 0] = position[up[up >= 0]]
+        return np.array(_subtree_sizes(up.tolist()), dtype=np.int64)[position]
+
+
+class TreeIndex(RootedTree):
+    """
+    Индекс дерева: RootedTree плюс глубины и интервалы эйлерова обхода.
+
+    Атрибуты (дополнительно к RootedTree):
+        tin, tout: интервал вершины в прямом порядке обхода
+        order: вершины в прямом порядке обхода (order[tin[v]] == v)
+        depth: расстояние от корня
+        size: число вершин в поддереве (вместе с самой вершиной)
+    """
+
+    def _build(self) -> None:
+        self._euler_tour()
+        self._groups = {}
+        self._level_keys = self._level_nodes = None
+
+    def _euler_tour(self) -> None:
+        # Итеративный обход в глубину: глубина дерева не ограничена стеком Python
+        n = self.n
+        # Дети каждой вершины в обратном порядке: первый ребёнок окажется
+        # на вершине стека и будет посещён первым
+        ptr = self.child_ptr
+        rev = np.repeat(ptr[:-1] + ptr[1:] - 1, np.diff(ptr)) - np.arange(len(self.child_idx))
+        kids = self.child_idx[rev].tolist()
+        ptr = ptr.tolist()
+
+        order = []
+        stack = self.roots[::-1].tolist()
+        pop, push, visit = stack.pop, stack.extend, order.append
+        while stack:
+            v = pop()
+            visit(v)
+            push(kids[ptr[v]:ptr[v + 1]])
+
+        if len(order) != n:
+            raise ValueError("Не дерево: часть вершин недостижима из корня")
+
+        self.order = np.array(order, dtype=np.int64)
+        self.tin = np.empty(n, dtype=np.int64)
+        self.tin[self.order] = np.arange(n)
+
+        # Глубины и размеры поддеревьев считаются в нумерации прямого порядка:
+        # родитель всегда левее ребёнка, а обращения к памяти последовательны
+        up = self.parent[self.order]
+        up[up >= 0] = self.tin[up[up >= 0]]
+        up = up.tolist()
+        self.depth = np.array(_depths(up), dtype=np.int64)[self.tin]
+        self.size = np.array(_subtree_sizes(up), dtype=np.int64)[self.tin]
+        self.tout = self.tin + self.size
+
+    def descendants(self, v: int) -> np.ndarray:
+        """Все потомки v (без самой v) в прямом порядке обхода"""
+        return self.order[self.tin[v] + 1:self.tout[v]]
+
+    def is_ancestor(self, a: Union[int, np.ndarray], b: Union[int, np.ndarray]):
+        """a -- строгий предок b; работает и поэлементно для массивов индексов"""
+        tb = self.tin[b]
+        return (self.tin[a] < tb) & (tb < self.tout[a])
+
+    def is_indirect_ancestor(self, a: Union[int, np.ndarray], b: Union[int, np.ndarray]):
+        """a -- предок b, но не родитель (предикат r3)"""
+        return self.is_ancestor(a, b) & (self.parent[b] != a)
+
+    def ancestor_at_depth(self, v: Union[int, np.ndarray], k: Union[int, np.ndarray]):
+        """
+        Предок v на глубине k (k <= depth[v]); поэлементно для массивов.
+
+        Среди вершин глубины k предок -- вершина с наибольшим tin, не большим
+        tin[v], поэтому ответ -- один двоичный поиск по ключам (глубина, tin),
+        независимо от расстояния до предка.
+        """
+        if self._level_keys is None:
+            keys = self.depth * self.n + self.tin
+            self._level_nodes = np.argsort(keys, kind="stable")
+            self._level_keys = keys[self._level_nodes]
+        position = np.searchsorted(self._level_keys, np.asarray(k) * self.n + self.tin[v], side="right") - 1
+        return self._level_nodes[position]
+
+    def indirect_descendants(self, v: int) -> np.ndarray:
+        """Потомки v, не являющиеся её детьми (строка r3)"""
+        desc = self.descendants(v)
+        return desc[self.parent[desc] != v]
+
+    def sibling_groups(self) -> GroupPartition:
+        """Дети одного родителя (корни ни с кем не группируются)"""
+        if "parent" not in self._groups:
+            self._groups["parent"] = GroupPartition(self.parent, self.parent >= 0)
+        return self._groups["parent"]
+
@@ -34,28 +34,107 @@
 #   [0, 0, 1, 0, 0],
 #   [0, 0, 1, 0, 0]]
 
+#
+# Режимы вывода (параметр output):
+#   "dense"  -- список списков (по умолчанию, как в условии);
+#   "csr"    -- разреженное представление CSR: row_ptr (n + 1) и col_idx (|E|),
+#               память O(|E|);
+#   "packed" -- плотная битовая матрица n x ceil(n / 8) типа uint8, один бит на
+#               ячейку, память n^2 / 8 байт. Раскладка совпадает с np.packbits,
+#               поэтому полную матрицу можно получить через
+#               np.unpackbits(packed, axis=1, count=n).
+#
+# Вместо CSV можно передать двоичный снимок графа (common.snapshot): путь к
+# файлу снимка или открытый GraphSnapshot -- тогда CSV не разбирается.
+#
+# reachability_index строит по тем же входным данным индекс достижимости
+# (common.reachability): reachable(u, v) и reachable_many(us, vs) отвечают,
+# есть ли путь из u в v, без обхода графа на каждый запрос.
+
+import os
 import sys
+from typing import NamedTuple, Union
 
-def main(csv_graph: str) -> list[list[int]]:
-    # Читаем содержимое файла как строку
-    with open(csv_graph, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Разбираем строку CSV в список рёбер
-    data = []
-    for line in content.strip().splitlines():
-        row = line.strip().split(',')
-        data.append(list(map(int, row)))
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.edges import load_edges_from_file
+from common.reachability import ReachabilityIndex
+from common.snapshot import GraphSnapshot, is_snapshot
+
+OUTPUT_MODES = ("dense", "csr", "packed")
+
+
+class CsrAdjacency(NamedTuple):
+    """Матрица смежности в формате CSR: соседи вершины i -- col_idx[row_ptr[i]:row_ptr[i + 1]]"""
+    row_ptr: np.ndarray
+    col_idx: np.ndarray
+    n: int
+
+
+def build_csr(src: np.ndarray, dst: np.ndarray, n: int) -> CsrAdjacency:
+    # Сортируем рёбра по (начало, конец) и убираем повторы
+    order = np.lexsort((dst, src))
+    src, dst = src[order], dst[order]
+    if len(src) > 1:
+        keep = np.ones(len(src), dtype=bool)
+        keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        src, dst = src[keep], dst[keep]
+
+    row_ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=row_ptr[1:])
+    return CsrAdjacency(row_ptr, dst.astype(np.int32), n)
+
+
+def build_packed(src: np.ndarray, dst: np.ndarray, n: int) -> np.ndarray:
+    packed = np.zeros((n, (n + 7) // 8), dtype=np.uint8)
+    # Старший бит байта соответствует первому столбцу (как в np.packbits)
+    masks = np.left_shift(1, 7 - (dst & 7)).astype(np.uint8)
+    np.bitwise_or.at(packed, (src, dst >> 3), masks)
+    return packed
+
+
+def load_graph_edges(csv_graph: Union[str, GraphSnapshot]) -> tuple[np.ndarray, np.ndarray]:
+    if isinstance(csv_graph, GraphSnapshot) or is_snapshot(csv_graph):
+        # Рёбра снимка уже разобраны и лежат в отображённом в память файле
+        snapshot = csv_graph if isinstance(csv_graph, GraphSnapshot) else GraphSnapshot(csv_graph)
+        return snapshot.edges()
+    # Читаем CSV блоками сразу в массивы начальных и конечных вершин
+    return load_edges_from_file(csv_graph)
+
+
+def reachability_index(csv_graph: Union[str, GraphSnapshot], method: str = "auto") -> ReachabilityIndex:
+    """Индекс достижимости графа; вершины в запросах нумеруются с 1, как в CSV"""
+    src, dst = load_graph_edges(csv_graph)
+    n = int(max(src.max(), dst.max()))
+    adjacency = build_csr(src.astype(np.int64) - 1, dst.astype(np.int64) - 1, n)
+    return ReachabilityIndex(adjacency.row_ptr, adjacency.col_idx, n, method=method, offset=1)
+
+
+def main(csv_graph: Union[str, GraphSnapshot], output: str = "dense") -> Union[list[list[int]], CsrAdjacency, np.ndarray]:
+    if output not in OUTPUT_MODES:
+        raise ValueError(f"Неизвестный режим вывода: {output!r}, ожидается один из {OUTPUT_MODES}")
+
+    src, dst = load_graph_edges(csv_graph)
     
     # Находим максимальный номер вершины
-    max_vertex = max(max(row) for row in data)
+    max_vertex = int(max(src.max(), dst.max()))
+    n = max_vertex
+
+    if output != "dense":
+        # Индексы с 0, а вершины с 1
+        src = src.astype(np.int64) - 1
+        dst = dst.astype(np.int64) - 1
+        if output == "csr":
+            return build_csr(src, dst, n)
+        return build_packed(src, dst, n)
     
     # Создаем матрицу размером max_vertex x max_vertex
-    n = max_vertex
     matrix = [[0] * n for _ in range(n)]
     
     # Заполняем матрицу (учитываем, что индексы с 0, а вершины с 1)
-    for start, end in data:
+    for start, end in zip(src.tolist(), dst.tolist()):
         matrix[start - 1][end - 1] = 1
     
     return matrix
@@ -63,12 +142,31 @@ def main(csv_graph: str) -> list[list[int]]:
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Использование: python main.py <path_to_csv>")
+        print("Использование: python main.py <path_to_csv> [dense|csr|packed]")
+        print("               python main.py <path_to_csv> reach [u v]")
         sys.exit(1)
 
     path = sys.argv[1]  # путь к CSV из аргументов командной строки
-    result = main(path)
+    mode = sys.argv[2] if len(sys.argv) > 2 else "dense"
+    if mode == "reach":
+        index = reachability_index(path)
+        stats = index.stats()
+        print(f"Индекс достижимости ({stats['method']}): {stats['nbytes']} байт, "
+              f"построен за {stats['build_seconds']:.4f} с")
+        if len(sys.argv) > 4:
+            u, v = int(sys.argv[3]), int(sys.argv[4])
+            print(f"{v} достижима из {u}:", index.reachable(u, v))
+        sys.exit(0)
+    result = main(path, mode)
 
-    print("Матрица смежности:")
-    for row in result:
-        print(row)
+    if mode == "csr":
+        print("row_ptr:", result.row_ptr.tolist())
+        print("col_idx:", result.col_idx.tolist())
+    elif mode == "packed":
+        print("Упакованная матрица смежности:")
+        for row in result:
+            print(' '.join(f'{byte:08b}' for byte in row))
+    else:
+        print("Матрица смежности:")
+        for row in result:
+            print(row)
@@ -1,22 +1,56 @@
-from typing import List, Tuple, Dict
+import os
+import sys
+from typing import Callable, List, Optional, Tuple, Union
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def main(s: str, e: str) -> Tuple[
-    List[List[bool]],
-    List[List[bool]],
-    List[List[bool]],
-    List[List[bool]],
-    List[List[bool]]
+from common.edges import load_edges_from_string
+from common.export import write_relations
+from common.profiling import stage
+from common.relations import TreeRelation, tree_relations
+from common.snapshot import GraphSnapshot
+from common.tree import TreeIndex
+
+
+def build_tree(s: Union[str, GraphSnapshot]) -> TreeIndex:
+    # Вершины по возрастанию номеров, массив родителей, списки детей
+    # и интервалы эйлерова обхода [tin, tout)
+    if isinstance(s, GraphSnapshot):
+        with stage("task1", "tree", edges=s.m) as st:
+            tree = TreeIndex.from_snapshot(s)
+            st.note(nodes=tree.n)
+        return tree
+
+    with stage("task1", "parse", chars=len(s)) as st:
+        src, dst = load_edges_from_string(s)
+        st.note(edges=len(src))
+
+    with stage("task1", "tree", edges=len(src)) as st:
+        tree = TreeIndex(src, dst)
+        st.note(nodes=tree.n)
+    return tree
+
+
+Matrix = List[List[bool]]
+
+
+def main(s: Union[str, GraphSnapshot], e: str, lazy: bool = False) -> Union[
+    Tuple[Matrix, Matrix, Matrix, Matrix, Matrix],
+    Tuple[TreeRelation, TreeRelation, TreeRelation, TreeRelation, TreeRelation],
 ]:
     """
     Построение матриц смежности для пяти предикатов на дереве.
 
     Аргументы:
-        s: str - CSV-строка рёбер в формате "1,2\n1,3\n3,4..."
+        s: str - CSV-строка рёбер в формате "1,2\n1,3\n3,4..." или
+            GraphSnapshot - открытый снимок графа (CSV не разбирается)
         e: str - идентификатор корневого узла (строка)
+        lazy: bool - вернуть ленивые представления TreeRelation вместо списков:
+            r[i][j], итерация по строкам и r.to_dense() без хранения n x n матриц
 
     Возвращает:
-        Tuple из пяти матриц смежности (каждая как List[List[bool]]):
+        Tuple из пяти матриц смежности (каждая как List[List[bool]];
+        при lazy=True -- TreeRelation):
         r1 - непосредственное управление (parent -> child)
         r2 - непосредственное подчинение (child -> parent)
         r3 - опосредованное управление (ancestor -> descendant, но не parent)
@@ -24,91 +58,51 @@ def main(s: str, e: str) -> Tuple[
         r5 - соподчинение (x,y имеют одного родителя)
     """
 
-    # --- Шаг 1. Разбор входных данных ---
-    edges = []
-    for line in s.strip().split("\n"):
-        u, v = line.strip().split(",")
-        edges.append((u.strip(), v.strip()))
-
-    # --- Шаг 2. Определим множество вершин ---
-    vertices = set()
-    for u, v in edges:
-        vertices.add(u)
-        vertices.add(v)
-    vertices = sorted(vertices, key=lambda x: int(x))  # сортируем по числовому значению
-    n = len(vertices)
-
-    # Соответствие: вершина -> индекс в матрице
-    idx: Dict[str, int] = {v: i for i, v in enumerate(vertices)}
-
-    # --- Шаг 3. Строим дерево (parent -> children) и обратное (child -> parent) ---
-    children: Dict[str, List[str]] = {v: [] for v in vertices}
-    parent: Dict[str, str] = {}
-
-    for u, v in edges:
-        children[u].append(v)
-        parent[v] = u
-
-    # --- Шаг 4. Инициализация матриц ---
-    r1 = [[False] * n for _ in range(n)]  # parent -> child
-    r2 = [[False] * n for _ in range(n)]  # child -> parent
-    r3 = [[False] * n for _ in range(n)]  # ancestor -> descendant (not parent)
-    r4 = [[False] * n for _ in range(n)]  # descendant -> ancestor (not child)
-    r5 = [[False] * n for _ in range(n)]  # siblings
-
-    # --- Шаг 5. Заполняем r1 и r2 ---
-    for u, vs in children.items():
-        for v in vs:
-            i, j = idx[u], idx[v]
-            r1[i][j] = True  # u -> v (непосредственное управление)
-            r2[j][i] = True  # v -> u (непосредственное подчинение)
-
-    # --- Шаг 6. Поиск всех предков и потомков ---
-    def dfs_ancestors(node: str) -> List[str]:
-        """Возвращает список всех предков вершины node"""
-        result = []
-        cur = node
-        while cur in parent:
-            p = parent[cur]
-            result.append(p)
-            cur = p
-        return result
-
-    def dfs_descendants(node: str) -> List[str]:
-        """Возвращает список всех потомков вершины node"""
-        result = []
-
-        def dfs(u: str):
-            for v in children[u]:
-                result.append(v)
-                dfs(v)
-
-        dfs(node)
-        return result
-
-    # --- Шаг 7. Заполняем r3 и r4 ---
-    for v in vertices:
-        i = idx[v]
-        # все предки v
-        ancestors = dfs_ancestors(v)
-        for a in ancestors:
-            j = idx[a]
-            if parent[v] == a:
-                # это непосредственный родитель => не учитываем в r3/r4
-                continue
-            r3[j][i] = True  # предок -> потомок (опосредованное управление)
-            r4[i][j] = True  # потомок -> предок (опосредованное подчинение)
-
-    # --- Шаг 8. Заполняем r5 (соподчинение) ---
-    for u, vs in children.items():
-        for i1 in range(len(vs)):
-            for i2 in range(len(vs)):
-                if i1 != i2:
-                    r5[idx[vs[i1]]][idx[vs[i2]]] = True
+    # --- Шаг 1-2. Разбор входных данных и индекс дерева ---
+    tree = build_tree(s)
+
+    # --- Шаг 3. Отношения как ленивые представления над индексом ---
+    # r2 и r4 -- транспонированные r1 и r3 над тем же индексом
+    with stage("task1", "relations", nodes=tree.n):
+        relations = tree_relations(tree)
+    if lazy:
+        return relations
 
+    # --- Шаг 4. Материализация матриц ---
+    with stage("task1", "materialize", nodes=tree.n):
+        r1, r2, r3, r4, r5 = (r.to_dense() for r in relations)
     return r1, r2, r3, r4, r5
 
 
+def export(
+    s: Union[str, GraphSnapshot],
+    e: str,
+    directory: str,
+    fmt: str = "packed",
+    block_rows: Optional[int] = None,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+) -> dict:
+    """
+    Запись матриц r1-r5 на диск блоками строк (common.export) без
+    материализации n x n списков: в памяти -- индекс дерева и один блок.
+
+    Аргументы:
+        s, e: как в main
+        directory: каталог для файлов .npy и manifest.json
+        fmt: "packed" - битовые матрицы n x ceil(n / 8) (np.packbits),
+            "csr" - номера столбцов единиц по строкам (indptr + indices)
+        block_rows: строк в блоке (по умолчанию блок около 32 МиБ)
+        progress: вызывается после каждого блока как progress("r1", строк записано, n)
+
+    Возвращает:
+        Содержимое manifest.json
+    """
+    tree = build_tree(s)
+    relations = tree_relations(tree)
+    with stage("task1", "export", nodes=tree.n):
+        return write_relations(relations, directory, fmt, block_rows, progress)
+
+
 # --- Пример использования ---
 if __name__ == "__main__":
     s = "1,2\n1,3\n3,4\n3,5\n5,6\n6,7"
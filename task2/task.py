@@ -1,84 +1,113 @@
+import argparse
+import glob
+import json
 import math
-from typing import Tuple, List
+import os
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 
-def task(s: str, e: str) -> Tuple[float, float]:
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.edges import load_edges_from_string
+from common.profiling import stage
+from common.snapshot import GraphSnapshot
+from common.tree import RootedTree
+
+K_RELATIONS = 5  # число типов отношений
+
+
+def relation_counts(tree: RootedTree, root: int) -> np.ndarray:
+    """
+    Число исходящих связей каждой вершины по пяти отношениям за O(n),
+    без построения самих отношений
+
+    Args:
+        tree (RootedTree): дерево
+        root (int): индекс корня, от которого отсчитываются уровни
+
+    Returns:
+        np.ndarray: матрица lij размера n x 5, строки -- вершины по возрастанию номеров
+    """
+    order, depth = tree.level_order(np.array([root]))
+    children = tree.child_count()
+    size = tree.subtree_sizes(order)
+
+    lij = np.empty((tree.n, K_RELATIONS), dtype=np.int64)
+    lij[:, 0] = children                           # r1: дети
+    lij[:, 1] = tree.parent >= 0                   # r2: родитель
+    lij[:, 2] = size - 1 - children                # r3: потомки, кроме детей
+    lij[:, 3] = np.maximum(depth - 1, 0)           # r4: предки, кроме родителя
+    lij[:, 4] = np.bincount(depth)[depth] - 1      # r5: другие вершины того же уровня
+    return lij
+
+
+def structure_entropy(lij: np.ndarray, n: int) -> float:
+    """
+    Энтропия по матрице lij
+
+    Слагаемое -P * log2(P) вычисляется через math один раз на каждое
+    различное значение счётчика, а сумма накапливается последовательно в
+    порядке (вершина, отношение) -- результат совпадает с поэлементным
+    циклом до последнего бита.
+    """
+    counts = lij.ravel()
+    if not len(counts):
+        return 0.0
+    term_of_value = np.zeros(int(counts.max()) + 1)
+    for count in np.flatnonzero(np.bincount(counts)).tolist():
+        if count > 0:
+            P = count / (n - 1)
+            term_of_value[count] = -P * math.log2(P)
+    return float(np.cumsum(term_of_value[counts])[-1])
+
+
+def task(s: Union[str, GraphSnapshot], e: Optional[str]) -> Tuple[float, float]:
     """
     Функция вычисляет энтропию структуры графа и нормированную оценку
     структурной сложности
 
     Args:
         s (str): CSV-строка со списком рёбер ориентированного дерева, например:
-        e (str): идентификатор корневого узла
+            (или GraphSnapshot -- открытый снимок графа, CSV не разбирается)
+        e (str): идентификатор корневого узла (None -- единственная вершина без родителя)
 
     Returns:
         Tuple[float, float]: (энтропия, нормированная оценка), округлённые до 1 знака
     """
 
     # ---------- Парсинг входных данных ----------
-    edges = [tuple(map(int, line.split(","))) for line in s.strip().splitlines()]
-    nodes = sorted(set(u for u, v in edges) | set(v for u, v in edges))
-    n = len(nodes)
-    root = int(e)
-
-    # ---------- Построение вспомогательных структур ----------
-    # adjacency: список потомков для каждой вершины
-    adj = {node: [] for node in nodes}
-    for u, v in edges:
-        adj[u].append(v)
-
-    # parent: для обратных связей
-    parent = {v: u for u, v in edges}
-
-    # уровни для определения r5 (один уровень)
-    level = {root: 0}
-    queue = [root]
-    while queue:
-        cur = queue.pop(0)
-        for ch in adj[cur]:
-            level[ch] = level[cur] + 1
-            queue.append(ch)
-
-    # ---------- Определение отношений ----------
-    r1 = set(edges)  # непосредственное управление
-    r2 = {(b, a) for a, b in r1}  # непосредственное подчинение
-    print
-    # r3 и r4 — опосредованные (через потомков потомков)
-    r3 = set()
-    for u in nodes:
-        stack = list(adj[u])
-        while stack:
-            v = stack.pop()
-            for ch in adj.get(v, []):
-                r3.add((u, ch))
-                stack.append(ch)
-    r4 = {(b, a) for a, b in r3}
-
-    # r5 — элементы одного уровня (сотрудничество)
-    r5 = set()
-    for i in nodes:
-        for j in nodes:
-            if i != j and level[i] == level[j]:
-                r5.add((i, j))
-
-    relations = [r1, r2, r3, r4, r5]
+    if isinstance(s, GraphSnapshot):
+        # Снимок уже содержит родителей и списки детей
+        with stage("task2", "tree", edges=s.m) as st:
+            tree = RootedTree.from_snapshot(s)
+            st.note(nodes=tree.n)
+    else:
+        with stage("task2", "parse", chars=len(s)) as st:
+            src, dst = load_edges_from_string(s)
+            st.note(edges=len(src))
+        with stage("task2", "tree", edges=len(src)) as st:
+            tree = RootedTree(src, dst)
+            st.note(nodes=tree.n)
+    n = tree.n
+    root = tree.root if e is None else tree.index(int(e))
 
     # ---------- Подсчёт исходящих связей ----------
-    lij = {node: [0] * 5 for node in nodes}
-    for i, r in enumerate(relations):
-        for u, v in r:
-            lij[u][i] += 1
+    # r1 -- число детей, r2 -- наличие родителя, r3 -- размер поддерева без
+    # детей, r4 -- глубина без родителя, r5 -- население уровня без самой вершины
+    with stage("task2", "counts", nodes=n):
+        lij = relation_counts(tree, root)
 
     # ---------- Энтропия ----------
-    H_total = 0.0
-    for node in nodes:
-        for count in lij[node]:
-            if count > 0:
-                P = count / (n - 1)
-                H_total += -P * math.log2(P)
+    with stage("task2", "entropy", nodes=n):
+        H_total = structure_entropy(lij, n)
 
     # ---------- Нормализация ----------
-    k = 5  # число типов отношений
+    k = K_RELATIONS
     c = 1 / (math.e * math.log(2))
     H_ref = c * n * k
     h_norm = H_total / H_ref if H_ref != 0 else 0
@@ -87,8 +116,278 @@ def task(s: str, e: str) -> Tuple[float, float]:
     return round(H_total, 1), round(h_norm, 2)
 
 
-# Пример из условия
+# ---------- Инкрементальное обновление ----------
+
+def _plogp(count: int) -> float:
+    return count * math.log2(count) if count > 0 else 0.0
+
+
+class StructureEntropy:
+    """
+    Энтропия дерева, пересчитываемая при точечных изменениях структуры
+
+    Энтропия записывается через две суммы по всем счётчикам c = lij:
+        H = (S1 * log2(n - 1) - S2) / (n - 1),  S1 = sum(c),  S2 = sum(c * log2(c)),
+    поэтому изменение n не требует пересчёта слагаемых. Счётчики r1-r3 хранятся
+    по вершинам и меняются только на пути к корню, а r4 и r5 зависят лишь от
+    глубины и учитываются целиком по уровням через их население.
+
+    Args:
+        tree (RootedTree): исходное дерево
+        root (int): индекс корня в tree
+    """
+
+    def __init__(self, tree: RootedTree, root: int):
+        order, depth = tree.level_order(np.array([root]))
+        size = tree.subtree_sizes(order)
+        labels = tree.labels.tolist()
+        parent = tree.parent.tolist()
+
+        self.root = labels[root]
+        self.parent: Dict[int, Optional[int]] = {
+            label: (labels[p] if p >= 0 else None) for label, p in zip(labels, parent)
+        }
+        self.children: Dict[int, List[int]] = {label: [] for label in labels}
+        for label, p in self.parent.items():
+            if p is not None:
+                self.children[p].append(label)
+        self.depth: Dict[int, int] = dict(zip(labels, depth.tolist()))
+        self.size: Dict[int, int] = dict(zip(labels, size.tolist()))
+        self.level_pop: Counter = Counter(self.depth.values())
+
+        self.S1 = 0
+        self.S2 = 0.0
+        for label in labels:
+            self._add_terms(self._node_counts(label), 1)
+        for d in self.level_pop:
+            self._add_terms(self._level_counts(d), 1)
+
+    @classmethod
+    def from_csv(cls, s: str, e: Optional[str] = None) -> "StructureEntropy":
+        tree = RootedTree(*load_edges_from_string(s))
+        return cls(tree, tree.root if e is None else tree.index(int(e)))
+
+    # ----- счётчики -----
+
+    # Счётчики возвращаются парами (значение, число вхождений)
+
+    def _node_counts(self, x: int) -> List[Tuple[int, int]]:
+        """r1, r2 и r3 вершины x"""
+        kids = len(self.children[x])
+        return [(kids, 1), (int(self.parent[x] is not None), 1), (self.size[x] - 1 - kids, 1)]
+
+    def _level_counts(self, d: int) -> List[Tuple[int, int]]:
+        """r4 и r5 всех вершин уровня d"""
+        pop = self.level_pop[d]
+        return [(max(d - 1, 0), pop), (pop - 1, pop)]
+
+    def _add_terms(self, counts: List[Tuple[int, int]], sign: int) -> None:
+        for value, times in counts:
+            if value > 0:
+                self.S1 += sign * times * value
+                self.S2 += sign * times * _plogp(value)
+
+    def _update_node(self, x: int, change) -> None:
+        self._add_terms(self._node_counts(x), -1)
+        change()
+        self._add_terms(self._node_counts(x), 1)
+
+    def _shift_levels(self, delta: Counter) -> None:
+        for d, diff in delta.items():
+            if not diff:
+                continue
+            self._add_terms(self._level_counts(d), -1)
+            self.level_pop[d] += diff
+            self._add_terms(self._level_counts(d), 1)
+            if not self.level_pop[d]:
+                del self.level_pop[d]
+
+    def _resize_path(self, start: Optional[int], diff: int) -> None:
+        """Размеры поддеревьев start и всех его предков меняются на diff"""
+        x = start
+        while x is not None:
+            self._add_terms(self._node_counts(x), -1)
+            self.size[x] += diff
+            self._add_terms(self._node_counts(x), 1)
+            x = self.parent[x]
+
+    # ----- операции -----
+
+    def add_edge(self, u: int, v: int) -> None:
+        """Добавляет новую вершину-лист v с родителем u"""
+        if u not in self.parent:
+            raise KeyError(u)
+        if v in self.parent:
+            raise ValueError(f"Вершина {v} уже есть в дереве")
+        self._update_node(u, lambda: self.children[u].append(v))
+        self._resize_path(u, 1)
+
+        self.parent[v] = u
+        self.children[v] = []
+        self.depth[v] = self.depth[u] + 1
+        self.size[v] = 1
+        self._add_terms(self._node_counts(v), 1)
+        self._shift_levels(Counter({self.depth[v]: 1}))
+
+    def remove_edge(self, u: int, v: int) -> None:
+        """Удаляет лист v вместе с ребром (u, v)"""
+        if u is None or self.parent.get(v) != u:
+            raise KeyError((u, v))
+        if self.children[v]:
+            raise ValueError(f"Вершина {v} не лист: удаление ребра разорвёт дерево")
+        self._add_terms(self._node_counts(v), -1)
+        self._shift_levels(Counter({self.depth[v]: -1}))
+        for table in (self.parent, self.children, self.depth, self.size):
+            del table[v]
+
+        self._update_node(u, lambda: self.children[u].remove(v))
+        self._resize_path(u, -1)
+
+    def reparent(self, node: int, new_parent: int) -> None:
+        """Переносит поддерево node под new_parent"""
+        old_parent = self.parent[node]
+        if old_parent is None:
+            raise ValueError("Корень нельзя переподчинить")
+        if new_parent not in self.parent:
+            raise KeyError(new_parent)
+        if new_parent == old_parent:
+            return
+        x = new_parent
+        while x is not None:
+            if x == node:
+                raise ValueError(f"Вершина {new_parent} лежит в поддереве {node}")
+            x = self.parent[x]
+
+        moved = self.size[node]
+        self._update_node(old_parent, lambda: self.children[old_parent].remove(node))
+        self._resize_path(old_parent, -moved)
+        self.parent[node] = new_parent
+        self._update_node(new_parent, lambda: self.children[new_parent].append(node))
+        self._resize_path(new_parent, moved)
+
+        # Глубины всего поддерева сдвигаются на одну и ту же величину
+        shift = self.depth[new_parent] + 1 - self.depth[node]
+        if shift:
+            levels = Counter()
+            stack = [node]
+            while stack:
+                x = stack.pop()
+                levels[self.depth[x]] -= 1
+                self.depth[x] += shift
+                levels[self.depth[x]] += 1
+                stack.extend(self.children[x])
+            self._shift_levels(levels)
+
+    # ----- результат -----
+
+    @property
+    def n(self) -> int:
+        return len(self.parent)
+
+    @property
+    def H_total(self) -> float:
+        n = self.n
+        if n < 2:
+            return 0.0
+        return (self.S1 * math.log2(n - 1) - self.S2) / (n - 1)
+
+    @property
+    def h_norm(self) -> float:
+        H_ref = 1 / (math.e * math.log(2)) * self.n * K_RELATIONS
+        return self.H_total / H_ref if H_ref != 0 else 0
+
+    def result(self) -> Tuple[float, float]:
+        """То же, что task() для текущего дерева"""
+        return round(self.H_total, 1), round(self.h_norm, 2)
+
+    def to_csv(self) -> str:
+        return "\n".join(f"{p},{v}" for v, p in self.parent.items() if p is not None)
+
+
+# ---------- Пакетная обработка ----------
+
+def _read_csv(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as fh:
+        return fh.read()
+
+
+def _score_chunk(items: List[Tuple[str, Optional[str]]], from_files: bool) -> List[Tuple[float, float]]:
+    # Выполняется в рабочем процессе: одна пересылка на целую порцию деревьев
+    if from_files:
+        return [task(_read_csv(path), e) for path, e in items]
+    return [task(s, e) for s, e in items]
+
+
+def task_batch(
+    items: Iterable[Tuple[str, Optional[str]]],
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    from_files: bool = False,
+) -> Iterator[Tuple[float, float]]:
+    """
+    Оценивает много деревьев параллельно, возвращая результаты в исходном порядке
+
+    Args:
+        items: пары (CSV-строка, корень) или (путь к CSV, корень) при from_files=True
+        workers (int): число процессов (по умолчанию -- число ядер; 1 -- без пула)
+        chunk_size (int): сколько деревьев отправляется процессу за одну пересылку
+        from_files (bool): передавать процессам пути, а не содержимое файлов
+
+    Yields:
+        Tuple[float, float]: результат task для очередного элемента
+    """
+    workers = workers or os.cpu_count() or 1
+    items = iter(items)
+    chunks = iter(lambda: list(islice(items, chunk_size)), [])
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from _score_chunk(chunk, from_files)
+        return
+
+    # В полёте не больше двух порций на процесс: вход читается по мере
+    # выдачи результатов и не копится в памяти целиком
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_score_chunk, chunk, from_files))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def score_directory(
+    directory: str,
+    pattern: str = "*.csv",
+    e: Optional[str] = None,
+    **options,
+) -> Iterator[Tuple[str, Tuple[float, float]]]:
+    """Оценивает все CSV-файлы каталога (по имени файла), выдаёт пары (путь, результат)"""
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    results = task_batch(((path, e) for path in paths), from_files=True, **options)
+    return zip(paths, results)
+
+
+def write_jsonl(records: Iterable[Tuple[str, Tuple[float, float]]], out=sys.stdout) -> None:
+    for name, (H, h_norm) in records:
+        out.write(json.dumps({"source": name, "H": H, "h_norm": h_norm}, ensure_ascii=False) + "\n")
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        parser = argparse.ArgumentParser(description="Пакетная оценка энтропии деревьев из каталога CSV (вывод в JSONL)")
+        parser.add_argument("directory")
+        parser.add_argument("--root", default=None, help="корень (по умолчанию -- вершина без родителя)")
+        parser.add_argument("--pattern", default="*.csv")
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument("--chunk-size", type=int, default=64)
+        args = parser.parse_args()
+        write_jsonl(score_directory(args.directory, args.pattern, args.root,
+                                    workers=args.workers, chunk_size=args.chunk_size))
+        sys.exit(0)
+
+    # Пример из условия
     s = "1,2\n1,3\n3,4\n3,5"
     e = "1"
     print(task(s, e))  # Ожидается (6.5, 0.49)
@@ -1,6 +1,18 @@
 import json
+import os
+import sys
+from collections import deque
+
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.cache import LRUCache, content_key
+from common.profiling import stage
+
+# Разобранные ранжировки: строка JSON -> (уровни объектов, максимальный объект)
+RANKING_CACHE = LRUCache(max_entries=256)
+
 
 def read_json(file_path: str) -> str:
     content = []
@@ -10,7 +22,7 @@ def read_json(file_path: str) -> str:
     return ''.join(content)
 
 
-def build_precedence_matrix(ranking: list[int, list[int]], total_objects: int) -> np.ndarray:
+def ranking_levels(ranking: list[int, list[int]], total_objects: int) -> np.ndarray:
     idx_mapping = {}
     lvl = 0
     
@@ -20,13 +32,42 @@ def build_precedence_matrix(ranking: list[int, list[int]], total_objects: int) -
             idx_mapping[item - 1] = lvl
         lvl += 1
     
-    col_indices = np.arange(total_objects)
-    row_levels = np.array([idx_mapping.get(i, 0) for i in range(total_objects)])
+    return np.array([idx_mapping.get(i, 0) for i in range(total_objects)], dtype=np.int64)
+
+
+def build_precedence_matrix(ranking: list[int, list[int]], total_objects: int) -> np.ndarray:
+    row_levels = ranking_levels(ranking, total_objects)
     
+    return precedence_from_levels(row_levels)
+
+
+def precedence_from_levels(row_levels: np.ndarray) -> np.ndarray:
     precedence = (row_levels[:, None] >= row_levels[None, :]).astype(int)
     return precedence
 
 
+def _parse_ranking(json_string: str) -> tuple[np.ndarray, int | None]:
+    ranking = json.loads(json_string)
+    objects = extract_all_objects([ranking])
+    max_obj = max(objects) if objects else None
+    levels = ranking_levels(ranking, max_obj or 0)
+    levels.flags.writeable = False
+    return levels, max_obj
+
+
+def load_ranking(json_string: str) -> tuple[np.ndarray, int | None]:
+    # Уровни объектов 1..max_obj; отсутствующие объекты, как и в ranking_levels,
+    # получают уровень 0, поэтому вектор для большего числа объектов -- это
+    # дополнение нулями
+    return RANKING_CACHE.get_or_build(content_key(json_string), lambda: _parse_ranking(json_string))
+
+
+def padded_levels(levels: np.ndarray, total_objects: int) -> np.ndarray:
+    padded = np.zeros(total_objects, dtype=np.int64)
+    padded[:min(len(levels), total_objects)] = levels[:total_objects]
+    return padded
+
+
 def extract_all_objects(rankings: list[list[int, list[int]]]) -> set:
     collected = set()
     for rnk in rankings:
@@ -36,17 +77,14 @@ def extract_all_objects(rankings: list[list[int, list[int]]]) -> set:
     return collected
 
 
+def extract_contradiction_kernel(matrix_ab: np.ndarray, matrix_ab_prime: np.ndarray) -> np.ndarray:
+    # Пары (i, j), i < j, несравнимые в обеих матрицах: массив (k, 2) с номерами объектов
+    mask = np.triu((matrix_ab == 0) & (matrix_ab_prime == 0), 1)
+    return (np.argwhere(mask) + 1).astype(np.int32).reshape(-1, 2)
+
+
 def find_contradiction_kernel(matrix_ab: np.ndarray, matrix_ab_prime: np.ndarray) -> list[list[int]]:
-    discrepancies = []
-    dim = matrix_ab.shape[0]
-    
-    mask = (matrix_ab == 0) & (matrix_ab_prime == 0)
-    for i in range(dim):
-        for j in range(i + 1, dim):
-            if mask[i, j]:
-                discrepancies.append([i + 1, j + 1])
-                
-    return discrepancies
+    return extract_contradiction_kernel(matrix_ab, matrix_ab_prime).tolist()
 
 
 def warshall_algorithm(matrix: np.ndarray) -> np.ndarray:
@@ -59,6 +97,117 @@ def warshall_algorithm(matrix: np.ndarray) -> np.ndarray:
     return transitive.astype(int)
 
 
+def pack_rows(matrix: np.ndarray) -> np.ndarray:
+    size = matrix.shape[0]
+    words = max(1, (matrix.shape[1] + 63) // 64)
+    padded = np.zeros((size, words * 64), dtype=bool)
+    padded[:, :matrix.shape[1]] = matrix.astype(bool)
+    return np.packbits(padded, axis=1, bitorder='little').view('<u8')
+
+
+def unpack_rows(packed: np.ndarray, width: int) -> np.ndarray:
+    as_bytes = np.ascontiguousarray(packed).astype('<u8').view(np.uint8)
+    return np.unpackbits(as_bytes, axis=1, count=width, bitorder='little').astype(bool)
+
+
+def warshall_bitset(matrix: np.ndarray, packed: bool = False) -> np.ndarray:
+    n_dim = matrix.shape[0]
+    rows = pack_rows(matrix)
+    
+    # Строка k добавляется ко всем строкам, в которых стоит бит k: OR целыми словами
+    for intermediate in range(n_dim):
+        word, bit = divmod(intermediate, 64)
+        reach_k = ((rows[:, word] >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        if reach_k.any():
+            rows[reach_k] |= rows[intermediate]
+    
+    return rows if packed else unpack_rows(rows, n_dim).astype(int)
+
+
+def _union_find_components(matrix: np.ndarray) -> list[list[int]]:
+    size = matrix.shape[0]
+    root = list(range(size))
+    
+    def find(x: int) -> int:
+        while root[x] != x:
+            root[x] = root[root[x]]
+            x = root[x]
+        return x
+    
+    sources, targets = np.nonzero(np.triu(matrix, 1))
+    for u, v in zip(sources.tolist(), targets.tolist()):
+        ru, rv = find(u), find(v)
+        if ru != rv:
+            root[max(ru, rv)] = min(ru, rv)
+    
+    groups = {}
+    for vertex in range(size):
+        groups.setdefault(find(vertex), []).append(vertex + 1)
+    return list(groups.values())
+
+
+def _tarjan_components(matrix: np.ndarray) -> list[list[int]]:
+    size = matrix.shape[0]
+    sources, targets = np.nonzero(matrix)
+    row_ptr = np.searchsorted(sources, np.arange(size + 1)).tolist()
+    targets = targets.tolist()
+    
+    index = [-1] * size
+    low = [0] * size
+    on_stack = [False] * size
+    stack, groups = [], []
+    counter = 0
+    
+    for start in range(size):
+        if index[start] >= 0:
+            continue
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack[start] = True
+        work = [(start, row_ptr[start])]
+        while work:
+            node, pos = work[-1]
+            if pos < row_ptr[node + 1]:
+                work[-1] = (node, pos + 1)
+                nb = targets[pos]
+                if index[nb] < 0:
+                    index[nb] = low[nb] = counter
+                    counter += 1
+                    stack.append(nb)
+                    on_stack[nb] = True
+                    work.append((nb, row_ptr[nb]))
+                elif on_stack[nb]:
+                    low[node] = min(low[node], index[nb])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    vertex = stack.pop()
+                    on_stack[vertex] = False
+                    component.append(vertex + 1)
+                    if vertex == node:
+                        break
+                groups.append(sorted(component))
+    return groups
+
+
+def find_closure_components(matrix: np.ndarray) -> list[list[int]]:
+    # Компоненты замыкания без построения самого замыкания, O(n + m):
+    # для симметричного отношения -- система непересекающихся множеств,
+    # в общем случае -- итеративный алгоритм Тарьяна
+    relation = matrix.astype(bool)
+    if np.array_equal(relation, relation.T):
+        groups = _union_find_components(relation)
+    else:
+        groups = _tarjan_components(relation)
+    return sorted(groups, key=lambda group: group[0])
+
+
 def find_connected_components(closure_matrix: np.ndarray) -> list[list[int]]:
     size = closure_matrix.shape[0]
     marked = [False] * size
@@ -80,87 +229,258 @@ def find_connected_components(closure_matrix: np.ndarray) -> list[list[int]]:
     return groups
 
 
+def _sparse_rows(matrix: np.ndarray) -> tuple[list[int], list[int]]:
+    sources, targets = np.nonzero(matrix)
+    row_ptr = np.searchsorted(sources, np.arange(matrix.shape[0] + 1))
+    return row_ptr.tolist(), targets.tolist()
+
+
 def topological_sort_clusters(cluster_matrix: np.ndarray, num_clusters: int) -> list[int]:
+    row_ptr, targets = _sparse_rows(cluster_matrix[:num_clusters, :num_clusters] == 1)
     seen = [False] * num_clusters
     stack = []
     
-    def explore(node: int):
-        seen[node] = True
-        neighbors = np.where(cluster_matrix[node] == 1)[0]
-        for nb in neighbors:
-            if not seen[nb]:
-                explore(nb)
-        stack.append(node)
-    
+    # Тот же обход в глубину, что и рекурсивный, но на явном стеке
     for v in range(num_clusters):
-        if not seen[v]:
-            explore(v)
+        if seen[v]:
+            continue
+        seen[v] = True
+        work = [(v, row_ptr[v])]
+        while work:
+            node, pos = work[-1]
+            if pos < row_ptr[node + 1]:
+                work[-1] = (node, pos + 1)
+                nb = targets[pos]
+                if not seen[nb]:
+                    seen[nb] = True
+                    work.append((nb, row_ptr[nb]))
+                continue
+            work.pop()
+            stack.append(node)
     
     return stack[::-1]
 
 
-def main(json_string_a: str, json_string_b: str) -> str:
-    data_a = json.loads(json_string_a)
-    data_b = json.loads(json_string_b)
+def build_cluster_graph(combined: np.ndarray, components: list[list[int]]) -> tuple[list[int], list[int]]:
+    # Фактор-граф по представителям кластеров одной выборкой, в виде CSR
+    reps = np.array([group[0] - 1 for group in components], dtype=np.int64)
+    adjacency = combined[np.ix_(reps, reps)] == 1
+    np.fill_diagonal(adjacency, False)
+    return _sparse_rows(adjacency)
+
+
+def kahn_sort_clusters(row_ptr: list[int], targets: list[int], num_clusters: int) -> list[int]:
+    indegree = [0] * num_clusters
+    for nb in targets:
+        indegree[nb] += 1
     
-    universe = extract_all_objects([data_a, data_b])
+    ready = deque(v for v in range(num_clusters) if indegree[v] == 0)
+    ordering = []
+    while ready:
+        node = ready.popleft()
+        ordering.append(node)
+        for nb in targets[row_ptr[node]:row_ptr[node + 1]]:
+            indegree[nb] -= 1
+            if indegree[nb] == 0:
+                ready.append(nb)
     
-    if not universe:
-        return json.dumps({"kernel": [], "consistent_ranking": []})
+    if len(ordering) != num_clusters:
+        raise ValueError("Граф кластеров содержит цикл")
+    return ordering
+
+
+def _strict_inversions(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Все пары позиций i < j с values[i] > values[j]: восходящая сортировка слиянием,
+    # на каждом уровне пары "левый блок -- правый блок" находятся одним searchsorted
+    size = len(values)
+    order = np.arange(size)
+    span = int(values.max()) + 2 if size else 1
+    found_left, found_right = [], []
+    idx = np.arange(size)
+    width = 1
+    while width < size:
+        block = idx // (2 * width)
+        is_left = (idx // width) % 2 == 0
+        vals = values[order]
+        left_idx, right_idx = np.flatnonzero(is_left), np.flatnonzero(~is_left)
+        left_keys = block[left_idx] * span + vals[left_idx]
+        right_block = block[right_idx] * span
+        start = np.searchsorted(left_keys, right_block + vals[right_idx], side='right')
+        end = np.searchsorted(left_keys, right_block + span - 1, side='right')
+        counts = end - start
+        total = int(counts.sum())
+        if total:
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            found_left.append(order[left_idx[np.repeat(start, counts) + offsets]])
+            found_right.append(order[np.repeat(right_idx, counts)])
+        order = order[np.lexsort((vals, block))]
+        width *= 2
+    if not found_left:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.copy()
+    return np.concatenate(found_left), np.concatenate(found_right)
+
+
+def _pair_kernel(levels_a: np.ndarray, levels_b: np.ndarray) -> np.ndarray:
+    # Противоречие -- строгая инверсия уровней B в последовательности,
+    # упорядоченной по (уровень в A, уровень в B)
+    sequence = np.lexsort((levels_b, levels_a))
+    pos_x, pos_y = _strict_inversions(levels_b[sequence])
+    pairs = np.stack((sequence[pos_x], sequence[pos_y]), axis=1)
+    pairs.sort(axis=1)
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    return (pairs + 1).astype(np.int32).reshape(-1, 2)
+
+
+def cluster_levels(levels: np.ndarray) -> list[list[int]]:
+    # levels -- матрица (m, n) уровней объектов в m ранжировках. Кластеры (пары
+    # противоречий плюс объекты с одинаковыми уровнями везде) -- непрерывные
+    # отрезки лексикографической сортировки; граница проходит там, где в каждой
+    # ранжировке максимум префикса не больше минимума суффикса. Отрезки
+    # упорядочены по доминированию, поэтому ранжировка -- они же в обратном порядке
+    size = levels.shape[1]
+    if not size:
+        return []
+    sequence = np.lexsort(levels[::-1])
+    ordered = levels[:, sequence]
     
-    max_obj = max(universe)
+    prefix_max = np.maximum.accumulate(ordered, axis=1)
+    suffix_min = np.minimum.accumulate(ordered[:, ::-1], axis=1)[:, ::-1]
+    separable = np.all(prefix_max[:, :-1] <= suffix_min[:, 1:], axis=0)
+    same = np.all(ordered[:, 1:] == ordered[:, :-1], axis=0)
+    cuts = np.flatnonzero(separable & ~same) + 1
+    
+    clusters = [sorted((part + 1).tolist()) for part in np.split(sequence, cuts)]
+    return clusters[::-1]
+
+
+def consensus_from_levels(levels_a: np.ndarray, levels_b: np.ndarray) -> tuple[np.ndarray, list[list[int]]]:
+    return _pair_kernel(levels_a, levels_b), cluster_levels(np.stack((levels_a, levels_b)))
+
+
+def _format_ranking(clusters: list[list[int]]) -> list:
+    return [group[0] if len(group) == 1 else group for group in clusters]
+
+
+def main_from_levels(json_string_a: str, json_string_b: str) -> str:
+    levels_a, max_a = load_ranking(json_string_a)
+    levels_b, max_b = load_ranking(json_string_b)
     
-    mat_a = build_precedence_matrix(data_a, max_obj)
-    mat_b = build_precedence_matrix(data_b, max_obj)
+    if max_a is None and max_b is None:
+        return json.dumps({"kernel": [], "consistent_ranking": []})
     
-    intersection_ab = mat_a * mat_b
-    intersection_ab_t = mat_a.T * mat_b.T
+    max_obj = max(m for m in (max_a, max_b) if m is not None)
     
-    conflict_kernel = []
-    for x in range(max_obj):
-        for y in range(x + 1, max_obj):
-            if not intersection_ab[x, y] and not intersection_ab_t[x, y]:
-                conflict_kernel.append([x + 1, y + 1])
-
-    partial_1 = mat_a * mat_b.T
-    partial_2 = mat_a.T * mat_b
-    aggregation = np.logical_or(partial_1, partial_2).astype(int)
+    kernel, clusters = consensus_from_levels(padded_levels(levels_a, max_obj), padded_levels(levels_b, max_obj))
     
-    combined = mat_a * mat_b
+    output = {
+        "kernel": kernel.tolist(),
+        "consistent_ranking": _format_ranking(clusters)
+    }
     
-    for pair in conflict_kernel:
-        u, v = pair[0] - 1, pair[1] - 1
-        combined[u, v] = combined[v, u] = 1
+    return json.dumps(output, ensure_ascii=False)
+
+
+def encode_rankings(json_strings: list[str]) -> tuple[np.ndarray, list[int]]:
+    # Каждая ранжировка разбирается один раз (и берётся из кэша при повторе);
+    # уровни -- матрица (m, N) по общему множеству объектов, плюс максимальный
+    # объект каждой ранжировки
+    parsed = [load_ranking(js) for js in json_strings]
+    maxima = [max_obj or 0 for _, max_obj in parsed]
+    total = max(maxima, default=0)
+    levels = np.zeros((len(parsed), total), dtype=np.int64)
+    for row, (rnk_levels, _) in enumerate(parsed):
+        levels[row] = padded_levels(rnk_levels, total)
+    return levels, maxima
+
+
+def aggregate_rankings(json_strings: list[str]) -> dict:
+    # Все попарные ядра и ранжировки плюс общая m-сторонняя согласованная
+    # ранжировка. Попарный результат совпадает с main(a, b): объекты обрезаются
+    # по максимуму пары. Общее ядро -- пары, несравнимые хотя бы в одной паре
+    # ранжировок, то есть объединение попарных ядер
+    levels, maxima = encode_rankings(json_strings)
+    pairwise = []
+    kernels = []
+    for i in range(len(json_strings)):
+        for j in range(i + 1, len(json_strings)):
+            width = max(maxima[i], maxima[j])
+            kernel, clusters = consensus_from_levels(levels[i, :width], levels[j, :width])
+            kernels.append(kernel)
+            pairwise.append({
+                "pair": [i, j],
+                "kernel": kernel.tolist(),
+                "consistent_ranking": _format_ranking(clusters)
+            })
     
-    equivalence = combined * combined.T
+    joint = np.unique(np.concatenate(kernels), axis=0) if kernels else np.empty((0, 2), dtype=np.int32)
+    return {
+        "pairwise": pairwise,
+        "kernel": joint.tolist(),
+        "consistent_ranking": _format_ranking(cluster_levels(levels))
+    }
+
+
+def main_multi(json_strings: list[str]) -> str:
+    return json.dumps(aggregate_rankings(json_strings), ensure_ascii=False)
+
+
+def main(json_string_a: str, json_string_b: str) -> str:
+    with stage("task3", "parse", chars=len(json_string_a) + len(json_string_b)):
+        levels_a, max_a = load_ranking(json_string_a)
+        levels_b, max_b = load_ranking(json_string_b)
     
-    star_closure = warshall_algorithm(equivalence)
+    if max_a is None and max_b is None:
+        return json.dumps({"kernel": [], "consistent_ranking": []})
     
-    components = find_connected_components(star_closure)
+    max_obj = max(m for m in (max_a, max_b) if m is not None)
     
-    cluster_cnt = len(components)
-    adjacency = np.zeros((cluster_cnt, cluster_cnt), dtype=int)
+    with stage("task3", "precedence", objects=max_obj):
+        mat_a = precedence_from_levels(padded_levels(levels_a, max_obj))
+        mat_b = precedence_from_levels(padded_levels(levels_b, max_obj))
     
-    for p in range(cluster_cnt):
-        for q in range(cluster_cnt):
-            if p != q:
-                repr_p = components[p][0] - 1
-                repr_q = components[q][0] - 1
-                adjacency[p, q] = int(combined[repr_p, repr_q] == 1)
+    with stage("task3", "kernel", objects=max_obj) as st:
+        intersection_ab = mat_a * mat_b
+        intersection_ab_t = mat_a.T * mat_b.T
+        
+        conflict_kernel = extract_contradiction_kernel(intersection_ab, intersection_ab_t)
+
+        partial_1 = mat_a * mat_b.T
+        partial_2 = mat_a.T * mat_b
+        aggregation = np.logical_or(partial_1, partial_2).astype(int)
+        st.note(pairs=len(conflict_kernel))
     
-    ordering = topological_sort_clusters(adjacency, cluster_cnt)
+    with stage("task3", "closure", objects=max_obj):
+        combined = mat_a * mat_b
+        
+        u, v = conflict_kernel[:, 0] - 1, conflict_kernel[:, 1] - 1
+        combined[u, v] = 1
+        combined[v, u] = 1
+        
+        equivalence = combined * combined.T
     
-    final_ranking = []
-    for pos in ordering:
-        group = components[pos]
-        final_ranking.append(group[0] if len(group) == 1 else group)
+    with stage("task3", "components", objects=max_obj) as st:
+        components = find_closure_components(equivalence)
+        st.note(clusters=len(components))
     
-    output = {
-        "kernel": conflict_kernel,
-        "consistent_ranking": final_ranking
-    }
+    with stage("task3", "topo_sort", clusters=len(components)):
+        cluster_cnt = len(components)
+        row_ptr, targets = build_cluster_graph(combined, components)
+        
+        ordering = kahn_sort_clusters(row_ptr, targets, cluster_cnt)
+        
+        final_ranking = []
+        for pos in ordering:
+            group = components[pos]
+            final_ranking.append(group[0] if len(group) == 1 else group)
     
-    return json.dumps(output, ensure_ascii=False)
+    with stage("task3", "output", pairs=len(conflict_kernel)):
+        output = {
+            "kernel": conflict_kernel.tolist(),
+            "consistent_ranking": final_ranking
+        }
+        
+        return json.dumps(output, ensure_ascii=False)
 
 
 
@@ -169,11 +489,11 @@ if __name__ == "__main__":
     json_string_b: str = read_json("task3/ranking-B.json")
     json_string_c: str = read_json("task3/ranking-C.json")
     
-    result_ab = json.loads(main(json_string_a, json_string_b))
-    print(f"AB:\nЯдро противоречий: {result_ab['kernel']}\nСогласованная кластерная ранжировка: {result_ab['consistent_ranking']}")
+    # Все три ранжировки разбираются один раз
+    result = aggregate_rankings([json_string_a, json_string_b, json_string_c])
+    names = "ABC"
+    for item in result["pairwise"]:
+        i, j = item["pair"]
+        print(f"{names[i]}{names[j]}:\nЯдро противоречий: {item['kernel']}\nСогласованная кластерная ранжировка: {item['consistent_ranking']}")
     
-    result_ac = json.loads(main(json_string_a, json_string_c))
-    print(f"AC:\nЯдро противоречий: {result_ac['kernel']}\nСогласованная кластерная ранжировка: {result_ac['consistent_ranking']}")
-
-    result_bc = json.loads(main(json_string_b, json_string_c))
-    print(f"BC:\nЯдро противоречий: {result_bc['kernel']}\nСогласованная кластерная ранжировка: {result_bc['consistent_ranking']}")
\ No newline at end of file
+    print(f"ABC:\nЯдро противоречий: {result['kernel']}\nСогласованная кластерная ранжировка: {result['consistent_ranking']}")
\ No newline at end of file
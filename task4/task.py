@@ -1,4 +1,18 @@
 import json
+import os
+import sys
+from bisect import bisect_left
+from itertools import product
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.cache import LRUCache, content_key
+from common.profiling import stage
+
+# Скомпилированные регуляторы (таблицы термов и универсум) по содержимому JSON
+MODEL_CACHE = LRUCache(max_entries=32)
 
 
 def read_json(file_path: str) -> str:
@@ -22,6 +36,15 @@ def parse_json_string(json_string: str) -> dict:
     return result
 
 
+def parse_variables(json_string: str) -> dict:
+    # Все входные переменные файла: {"температура": [...], "влажность": [...]}
+    payload = json.loads(json_string)
+    return {
+        name: {entry["id"]: entry["points"] for entry in records}
+        for name, records in payload.items()
+    }
+
+
 def linear_interpolation(xa, ya, xb, yb, x_val) -> float:
     dx = xb - xa
     if abs(dx) < 1e-9:
@@ -59,6 +82,24 @@ def calculate_trapezoidal_membership(terms, term, x) -> float:
     return 0.0
 
 
+def trapezoidal_membership_array(terms, term, xs) -> np.ndarray:
+    xs = np.asarray(xs, dtype=float)
+    if term not in terms:
+        return np.zeros(xs.shape)
+    
+    (a, ha), (b, hb), (c, hc), (d, hd) = terms[term]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rising = ha + (hb - ha) * ((xs - a) / (b - a)) if abs(b - a) >= 1e-9 else np.full(xs.shape, max(ha, hb))
+        falling = hc + (hd - hc) * ((xs - c) / (d - c)) if abs(d - c) >= 1e-9 else np.full(xs.shape, max(hc, hd))
+    
+    # Ветви проверяются в том же порядке, что и в calculate_trapezoidal_membership
+    conditions = [xs < a, xs > d, (a <= xs) & (xs <= b), (b <= xs) & (xs <= c), (c <= xs) & (xs <= d)]
+    choices = [np.full(xs.shape, float(ha)), np.full(xs.shape, float(hd)), rising,
+               np.full(xs.shape, float(max(hb, hc))), falling]
+    return np.select(conditions, choices, default=0.0)
+
+
 def create_output_range(terms_dict):
     extremes = []
     for _, shape in terms_dict.items():
@@ -109,21 +150,522 @@ def defuzzify(aggregated_membership, s_values, s_min, s_max):
     return candidates[len(candidates) // 2] if candidates else s_values[0]
 
 
+class FuzzyController:
+    def __init__(self, input_terms, output_terms, rules, num_points=1000):
+        self.input_terms = input_terms
+        self.output_terms = output_terms
+        self.rules = [(condition, consequence) for condition, consequence in rules]
+        
+        with stage("task4", "universe", points=num_points, rules=len(self.rules)):
+            self.lower, self.upper = create_output_range(output_terms)
+            self.universe = np.array(generate_discrete_values(self.lower, self.upper, num_points))
+            
+            # Функции принадлежности выходных термов вычисляются один раз на всём универсуме
+            self.output_table = np.array([
+                trapezoidal_membership_array(output_terms, consequence, self.universe)
+                for _, consequence in self.rules
+            ]).reshape(len(self.rules), len(self.universe))
+    
+    @classmethod
+    def from_json(cls, temperature_json: str, heat_lvl_json: str, mapping_json: str, num_points=1000):
+        with stage("task4", "parse", chars=len(temperature_json) + len(heat_lvl_json) + len(mapping_json)):
+            input_vars, output_vars, rule_base = load_input_data(temperature_json, heat_lvl_json, mapping_json)
+        return cls(input_vars, output_vars, rule_base, num_points)
+    
+    def firing_strengths(self, current_temp: float) -> np.ndarray:
+        return np.array([
+            calculate_trapezoidal_membership(self.input_terms, condition, current_temp)
+            for condition, _ in self.rules
+        ])
+    
+    def aggregate(self, current_temp: float) -> np.ndarray:
+        strengths = self.firing_strengths(current_temp)
+        active = strengths > 0
+        if not active.any():
+            return np.zeros(len(self.universe))
+        clipped = np.minimum(self.output_table[active], strengths[active, None])
+        # Аккумулятор эталона начинается с нуля
+        return np.maximum(np.maximum.reduce(clipped, axis=0), 0.0)
+    
+    def defuzzify(self, aggregated: np.ndarray) -> float:
+        top_val = aggregated.max() if len(aggregated) else 0.0
+        
+        if top_val == 0:
+            return (self.lower + self.upper) * 0.5
+        
+        candidates = np.flatnonzero(aggregated == top_val)
+        return float(self.universe[candidates[len(candidates) // 2]])
+    
+    def __call__(self, current_temp: float) -> float:
+        return self.defuzzify(self.aggregate(current_temp))
+    
+    def defuzzify_exact(self, current_temp: float, method="mom") -> float:
+        fired = [(consequence, firing) for (_, consequence), firing
+                 in zip(self.rules, self.firing_strengths(current_temp).tolist())]
+        return defuzzify_analytic(self.output_terms, fired, self.lower, self.upper, method)
+    
+    def firing_matrix(self, temps) -> np.ndarray:
+        temps = np.asarray(temps, dtype=float).reshape(-1)
+        strengths = np.empty((len(temps), len(self.rules)))
+        for r, (condition, _) in enumerate(self.rules):
+            strengths[:, r] = trapezoidal_membership_array(self.input_terms, condition, temps)
+        return strengths
+    
+    def aggregate_batch(self, temps) -> np.ndarray:
+        strengths = self.firing_matrix(temps)
+        aggregated = np.zeros((len(strengths), len(self.universe)))
+        clipped = np.empty_like(aggregated)
+        for r in range(len(self.rules)):
+            # Несработавшие правила (степень <= 0) не участвуют, как в apply_fuzzy_rules
+            firing = np.where(strengths[:, r] > 0, strengths[:, r], -np.inf)
+            np.minimum(self.output_table[r], firing[:, None], out=clipped)
+            np.maximum(aggregated, clipped, out=aggregated)
+        return aggregated
+    
+    def defuzzify_batch(self, aggregated: np.ndarray) -> np.ndarray:
+        midpoint = (self.lower + self.upper) * 0.5
+        if aggregated.shape[1] == 0:
+            return np.full(len(aggregated), midpoint)
+        
+        top_val = aggregated.max(axis=1)
+        is_top = aggregated == top_val[:, None]
+        # Средний из кандидатов: первая позиция, где накопленное число кандидатов
+        # превышает count // 2
+        middle = is_top.sum(axis=1) // 2
+        pick = np.argmax(np.cumsum(is_top, axis=1) > middle[:, None], axis=1)
+        return np.where(top_val == 0, midpoint, self.universe[pick])
+    
+    def evaluate(self, temps, chunk_size=4096) -> np.ndarray:
+        temps = np.asarray(temps, dtype=float)
+        flat = temps.reshape(-1)
+        result = np.empty(len(flat))
+        # Память ограничена матрицей chunk_size x len(universe)
+        for start in range(0, len(flat), chunk_size):
+            chunk = flat[start:start + chunk_size]
+            result[start:start + len(chunk)] = self.defuzzify_batch(self.aggregate_batch(chunk))
+        return result.reshape(temps.shape)
+
+
+def load_controller(temperature_json: str, heat_lvl_json: str, mapping_json: str) -> FuzzyController:
+    return MODEL_CACHE.get_or_build(
+        content_key("controller", temperature_json, heat_lvl_json, mapping_json),
+        lambda: FuzzyController.from_json(temperature_json, heat_lvl_json, mapping_json)
+    )
+
+
+def _membership_lines(terms, term):
+    if term not in terms:
+        return []
+    (a, ha), (b, hb), (c, hc), (d, hd) = terms[term]
+    lines = []
+    if abs(b - a) >= 1e-9:
+        lines.append((a, ha, (hb - ha) / (b - a)))
+    if abs(d - c) >= 1e-9:
+        lines.append((c, hc, (hd - hc) / (d - c)))
+    lo, hi = min(a, b, c, d), max(a, b, c, d)
+    return [(x0, y0, slope, lo, hi) for x0, y0, slope in lines if slope != 0]
+
+
+def _crossings(lines, levels) -> list:
+    points = []
+    # Пересечения линейных участков с уровнями
+    for x0, y0, slope, lo, hi in lines:
+        xs = x0 + (levels - y0) / slope
+        points.extend(xs[(lo <= xs) & (xs <= hi)].tolist())
+    
+    # Пересечения линейных участков между собой
+    for i, (x1, y1, s1, lo1, hi1) in enumerate(lines):
+        for x2, y2, s2, lo2, hi2 in lines[i + 1:]:
+            if s1 == s2:
+                continue
+            x = (y2 - y1 + s1 * x1 - s2 * x2) / (s1 - s2)
+            if max(lo1, lo2) <= x <= min(hi1, hi2):
+                points.append(x)
+    return points
+
+
+def _critical_points(controller) -> np.ndarray:
+    # Вне этих точек упорядочение всех степеней срабатывания и всех уровней
+    # выходных функций принадлежности не меняется, а значит не меняется и
+    # множество максимумов агрегированной функции
+    points = []
+    levels = [np.unique(controller.output_table), [0.0]]
+    lines = []
+    for condition, _ in controller.rules:
+        if condition in controller.input_terms:
+            shape = controller.input_terms[condition]
+            points.extend(coord for coord, _ in shape)
+            levels.append([h for _, h in shape])
+            lines.extend(_membership_lines(controller.input_terms, condition))
+    levels = np.unique(np.concatenate([np.asarray(v, dtype=float) for v in levels]))
+    
+    points.extend(_crossings(lines, levels))
+    return np.unique(np.asarray(points, dtype=float))
+
+
+class CompiledController:
+    def __init__(self, points, at_points, between):
+        # between[i] -- значение на интервале (points[i - 1], points[i])
+        self.points = np.asarray(points, dtype=float)
+        self.at_points = np.asarray(at_points, dtype=float)
+        self.between = np.asarray(between, dtype=float)
+        self._points = self.points.tolist()
+        self._at_points = self.at_points.tolist()
+        self._between = self.between.tolist()
+    
+    @classmethod
+    def compile(cls, controller: FuzzyController):
+        points = _critical_points(controller)
+        if not len(points):
+            return cls([], [], controller.evaluate([0.0]))
+        
+        at_points = controller.evaluate(points)
+        mids = points[:-1] + (points[1:] - points[:-1]) / 2
+        between = controller.evaluate(np.concatenate(([points[0] - 1.0], mids, [points[-1] + 1.0])))
+        # Между соседними числами с плавающей точкой интервал пуст
+        empty = np.concatenate(([False], (mids == points[:-1]) | (mids == points[1:]), [False]))
+        between[empty] = np.concatenate(([0.0], at_points[:-1], [0.0]))[empty]
+        
+        # Точка не нужна, если значение в ней и по обе стороны одинаково
+        keep = (at_points != between[:-1]) | (at_points != between[1:])
+        return cls(points[keep], at_points[keep], np.concatenate((between[:1], between[1:][keep])))
+    
+    def __len__(self) -> int:
+        return len(self._points)
+    
+    def __call__(self, current_temp: float) -> float:
+        i = bisect_left(self._points, current_temp)
+        if i < len(self._points) and self._points[i] == current_temp:
+            return self._at_points[i]
+        return self._between[i]
+    
+    def evaluate(self, temps) -> np.ndarray:
+        temps = np.asarray(temps, dtype=float)
+        i = np.searchsorted(self.points, temps)
+        if not len(self.points):
+            return self.between[i]
+        nearest = np.minimum(i, len(self.points) - 1)
+        exact = self.points[nearest] == temps
+        return np.where(exact, self.at_points[nearest], self.between[i])
+
+
+def compile_controller(temperature_json: str, heat_lvl_json: str, mapping_json: str) -> CompiledController:
+    return MODEL_CACHE.get_or_build(
+        content_key("compiled", temperature_json, heat_lvl_json, mapping_json),
+        lambda: CompiledController.compile(load_controller(temperature_json, heat_lvl_json, mapping_json))
+    )
+
+
+def verify_compiled(compiled: CompiledController, temperature_json: str, heat_lvl_json: str, mapping_json: str,
+                    num_points=2001, margin=1.0):
+    # Сверка с эталонной main на равномерной сетке, покрывающей все точки излома
+    if len(compiled):
+        low, high = compiled.points[0] - margin, compiled.points[-1] + margin
+    else:
+        low, high = -margin, margin
+    grid = np.concatenate((np.linspace(low, high, num_points), compiled.points))
+    
+    mismatches = []
+    for x, got in zip(grid.tolist(), compiled.evaluate(grid).tolist()):
+        expected = main_reference(temperature_json, heat_lvl_json, mapping_json, x)
+        if expected != got:
+            mismatches.append((x, expected, got))
+    return mismatches
+
+
+DEFAULT_VARIABLE = 'температура'
+T_NORMS = ("min", "product")
+
+
+class TermIndex:
+    def __init__(self, terms):
+        self.terms = terms
+        # Носитель терма: вне [a, d] функция равна ha слева и hd справа
+        supports = {}
+        for name, shape in terms.items():
+            coords = [coord for coord, _ in shape]
+            lo = -np.inf if shape[0][1] > 0 else min(coords)
+            hi = np.inf if shape[-1][1] > 0 else max(coords)
+            supports[name] = (lo, hi)
+        
+        bounds = sorted({v for pair in supports.values() for v in pair if np.isfinite(v)})
+        self.bounds = bounds
+        # Слоты: 2i -- интервал перед bounds[i], 2i + 1 -- сама точка bounds[i]
+        self.slots = [[] for _ in range(2 * len(bounds) + 1)]
+        for name, (lo, hi) in supports.items():
+            first = 0 if lo == -np.inf else 2 * bounds.index(lo) + 1
+            last = len(self.slots) - 1 if hi == np.inf else 2 * bounds.index(hi) + 1
+            for slot in range(first, last + 1):
+                self.slots[slot].append(name)
+    
+    def candidates(self, x: float) -> list:
+        i = bisect_left(self.bounds, x)
+        if i < len(self.bounds) and self.bounds[i] == x:
+            return self.slots[2 * i + 1]
+        return self.slots[2 * i]
+    
+    def memberships(self, x: float) -> dict:
+        degrees = {}
+        for name in self.candidates(x):
+            degree = calculate_trapezoidal_membership(self.terms, name, x)
+            if degree > 0:
+                degrees[name] = degree
+        return degrees
+
+
+class MultiInputController:
+    def __init__(self, input_vars, output_terms, rules, t_norm="min", num_points=1000):
+        if t_norm not in T_NORMS:
+            raise ValueError(f"Неизвестная t-норма: {t_norm!r}")
+        self.input_vars = input_vars
+        self.output_terms = output_terms
+        self.t_norm = t_norm
+        self.indexes = {name: TermIndex(terms) for name, terms in input_vars.items()}
+        
+        # Правило: кортеж пар (переменная, терм) и заключение; строка вместо
+        # словаря -- терм переменной по умолчанию, как в mapping.json
+        self.rules = []
+        for condition, consequence in rules:
+            if isinstance(condition, str):
+                condition = {DEFAULT_VARIABLE: condition}
+            self.rules.append((tuple(condition.items()), consequence))
+        
+        # Правила по полному набору посылок: переменные по возрастанию имён ->
+        # {термы этих переменных -> номера правил}. Порядок ключей в JSON не важен
+        self.rules_by_signature = {}
+        for r, (antecedents, _) in enumerate(self.rules):
+            if antecedents:
+                names, terms = zip(*sorted(antecedents))
+                self.rules_by_signature.setdefault(names, {}).setdefault(terms, []).append(r)
+        
+        self.consequences = sorted({consequence for _, consequence in self.rules})
+        self.lower, self.upper = create_output_range(output_terms)
+        self.universe = np.array(generate_discrete_values(self.lower, self.upper, num_points))
+        self.output_table = np.array([
+            trapezoidal_membership_array(output_terms, consequence, self.universe)
+            for consequence in self.consequences
+        ]).reshape(len(self.consequences), len(self.universe))
+        self._row_of = {consequence: k for k, consequence in enumerate(self.consequences)}
+    
+    @classmethod
+    def from_json(cls, inputs_json: str, heat_lvl_json: str, mapping_json: str, t_norm="min", num_points=1000):
+        return cls(parse_variables(inputs_json), parse_json_string(heat_lvl_json), json.loads(mapping_json),
+                   t_norm, num_points)
+    
+    def active_rules(self, readings: dict) -> dict:
+        degrees = {
+            name: self.indexes[name].memberships(x)
+            for name, x in readings.items() if name in self.indexes
+        }
+        
+        # Срабатывают только правила, все посылки которых активны: перебираются
+        # сочетания активных термов (или правила группы, если их меньше)
+        fired = []
+        for names, by_terms in self.rules_by_signature.items():
+            active = [degrees.get(name) for name in names]
+            if not all(active):
+                continue
+            combinations = 1
+            for terms in active:
+                combinations *= len(terms)
+            if combinations <= len(by_terms):
+                for terms in product(*active):
+                    fired.extend(by_terms.get(terms, ()))
+            else:
+                for terms, rules in by_terms.items():
+                    if all(term in degree for term, degree in zip(terms, active)):
+                        fired.extend(rules)
+        
+        strengths = {}
+        for r in sorted(fired):
+            firing = 1.0
+            for name, term in self.rules[r][0]:
+                degree = degrees[name][term]
+                firing = min(firing, degree) if self.t_norm == "min" else firing * degree
+            if firing > 0:
+                strengths[r] = firing
+        return strengths
+    
+    def fired(self, readings: dict) -> list:
+        # max_r min(f_r, m_c) == min(max_r f_r, m_c) для правил с одним заключением c
+        best = {}
+        for r, firing in self.active_rules(readings).items():
+            consequence = self.rules[r][1]
+            best[consequence] = max(best.get(consequence, 0.0), firing)
+        return sorted(best.items())
+    
+    def aggregate(self, readings: dict) -> np.ndarray:
+        aggregated = np.zeros(len(self.universe))
+        for consequence, firing in self.fired(readings):
+            np.maximum(aggregated, np.minimum(self.output_table[self._row_of[consequence]], firing), out=aggregated)
+        return aggregated
+    
+    def __call__(self, readings: dict, method=None) -> float:
+        if method is not None:
+            return defuzzify_analytic(self.output_terms, self.fired(readings), self.lower, self.upper, method)
+        aggregated = self.aggregate(readings)
+        top_val = aggregated.max() if len(aggregated) else 0.0
+        if top_val == 0:
+            return (self.lower + self.upper) * 0.5
+        candidates = np.flatnonzero(aggregated == top_val)
+        return float(self.universe[candidates[len(candidates) // 2]])
+
+
+def main_multi(inputs_json: str, heat_lvl_json: str, mapping_json: str, readings: dict, t_norm="min") -> float:
+    controller = MODEL_CACHE.get_or_build(
+        content_key("multi", t_norm, inputs_json, heat_lvl_json, mapping_json),
+        lambda: MultiInputController.from_json(inputs_json, heat_lvl_json, mapping_json, t_norm)
+    )
+    return controller(readings)
+
+
+DEFUZZ_METHODS = ("mom", "som", "lom", "centroid", "bisector")
+
+
+def aggregated_breakpoints(output_terms, fired, s_min, s_max) -> np.ndarray:
+    # Между соседними точками агрегированная функция max_r min(f_r, m_r(y))
+    # линейна: не меняются ни участки трапеций, ни то, какая из обрезанных
+    # функций максимальна
+    points = [s_min, s_max]
+    levels = [0.0]
+    lines = []
+    for consequence, firing in fired:
+        levels.append(firing)
+        if consequence in output_terms:
+            shape = output_terms[consequence]
+            points.extend(coord for coord, _ in shape)
+            levels.extend(h for _, h in shape)
+            lines.extend(_membership_lines(output_terms, consequence))
+    
+    points.extend(_crossings(lines, np.unique(np.asarray(levels, dtype=float))))
+    points = np.unique(np.asarray(points, dtype=float))
+    return points[(s_min <= points) & (points <= s_max)]
+
+
+def aggregated_membership(output_terms, fired, s_values) -> np.ndarray:
+    s_values = np.asarray(s_values, dtype=float)
+    aggregated = np.zeros(s_values.shape)
+    for consequence, firing in fired:
+        degree = trapezoidal_membership_array(output_terms, consequence, s_values)
+        np.maximum(aggregated, np.minimum(degree, firing), out=aggregated)
+    return aggregated
+
+
+def _segment_limits(output_terms, fired, ys):
+    # На открытом интервале между точками излома функция линейна, но в самих
+    # точках возможен скачок (плато трапеции -- max(hb, hc)), поэтому берутся
+    # односторонние пределы: по двум внутренним точкам отрезка
+    widths = np.diff(ys)
+    quarter = aggregated_membership(output_terms, fired, ys[:-1] + widths * 0.25)
+    three_quarters = aggregated_membership(output_terms, fired, ys[:-1] + widths * 0.75)
+    left = np.maximum(1.5 * quarter - 0.5 * three_quarters, 0.0)
+    right = np.maximum(1.5 * three_quarters - 0.5 * quarter, 0.0)
+    return widths, left, right
+
+
+def _area_split(ys, left, right, target) -> float:
+    # Точка, в которой площадь под кусочно-линейной функцией достигает target
+    widths = np.diff(ys)
+    cumulative = np.concatenate(([0.0], np.cumsum((left + right) * 0.5 * widths)))
+    k = min(int(np.searchsorted(cumulative, target, side='right')) - 1, len(widths) - 1)
+    rest = target - cumulative[k]
+    m0, m1, h = left[k], right[k], widths[k]
+    if h == 0 or rest <= 0:
+        return float(ys[k])
+    # m0 * t + (m1 - m0) / (2h) * t^2 = rest, устойчивая форма корня
+    slope = (m1 - m0) / (2 * h)
+    t = 2 * rest / (m0 + np.sqrt(max(m0 * m0 + 4 * slope * rest, 0.0)))
+    return float(min(ys[k] + t, ys[k + 1]))
+
+
+def defuzzify_analytic(output_terms, fired, s_min, s_max, method="mom") -> float:
+    if method not in DEFUZZ_METHODS:
+        raise ValueError(f"Неизвестный метод дефаззификации: {method!r}")
+    
+    fired = [(consequence, firing) for consequence, firing in fired if firing > 0]
+    ys = aggregated_breakpoints(output_terms, fired, s_min, s_max)
+    if len(ys) < 2:
+        return (s_min + s_max) * 0.5
+    
+    widths, left, right = _segment_limits(output_terms, fired, ys)
+    # Вырожденная сторона трапеции (a == b) даёт пик в единственной точке
+    at_points = aggregated_membership(output_terms, fired, ys)
+    top_val = max(left.max(), right.max(), at_points.max())
+    
+    if top_val <= 0:
+        return (s_min + s_max) * 0.5
+    
+    if method in ("centroid", "bisector"):
+        area = float(np.sum((left + right) * 0.5 * widths))
+        if method == "bisector":
+            return _area_split(ys, left, right, area * 0.5)
+        # Интеграл y * mu(y) по линейному участку -- точная формула трапеции
+        moment = np.sum(widths / 6 * (ys[:-1] * (2 * left + right) + ys[1:] * (left + 2 * right)))
+        return float(moment / area)
+    
+    # Множество максимумов: точки и концы отрезков, где значение или предел
+    # достигает top_val, и отрезки, на которых функция постоянна и равна top_val
+    level = top_val - 1e-9 * max(1.0, abs(top_val))
+    left_top, right_top = left >= level, right >= level
+    peaks = np.unique(np.concatenate((ys[at_points >= level], ys[:-1][left_top], ys[1:][right_top])))
+    if method == "som":
+        return float(peaks[0])
+    if method == "lom":
+        return float(peaks[-1])
+    
+    # mom -- середина множества максимумов по мере (предел defuzzify при
+    # бесконечно частой сетке); для изолированных пиков -- средний из них
+    plateau = left_top & right_top & (widths > 0)
+    if not plateau.any():
+        return float(peaks[len(peaks) // 2])
+    cumulative = np.cumsum(np.where(plateau, widths, 0.0))
+    half = cumulative[-1] * 0.5
+    k = int(np.searchsorted(cumulative, half))
+    return float(ys[k + 1] - (cumulative[k] - half))
+
+
+def main_analytic(temperature_json: str, heat_lvl_json: str, mapping_json: str, current_temp: float,
+                  method="mom") -> float:
+    controller = load_controller(temperature_json, heat_lvl_json, mapping_json)
+    return controller.defuzzify_exact(current_temp, method)
+
+
 def main(temperature_json: str, heat_lvl_json: str, mapping_json: str, current_temp: float) -> float:
-    input_vars = parse_json_string(temperature_json)
-    output_vars = parse_json_string(heat_lvl_json)
-    rule_base = json.loads(mapping_json)
+    # Разбор JSON и построение таблиц -- один раз на набор документов
+    controller = load_controller(temperature_json, heat_lvl_json, mapping_json)
     
-    lower, upper = create_output_range(output_vars)
-    universe = generate_discrete_values(lower, upper)
+    with stage("task4", "rules", rules=len(controller.rules)):
+        fuzzy_output = controller.aggregate(current_temp)
     
-    fuzzy_output = apply_fuzzy_rules(input_vars, output_vars, rule_base, current_temp, universe)
+    with stage("task4", "defuzzify", points=len(fuzzy_output)):
+        return controller.defuzzify(fuzzy_output)
+
+
+def main_reference(temperature_json: str, heat_lvl_json: str, mapping_json: str, current_temp: float) -> float:
+    with stage("task4", "parse", chars=len(temperature_json) + len(heat_lvl_json) + len(mapping_json)):
+        input_vars = parse_json_string(temperature_json)
+        output_vars = parse_json_string(heat_lvl_json)
+        rule_base = json.loads(mapping_json)
+    
+    with stage("task4", "universe"):
+        lower, upper = create_output_range(output_vars)
+        universe = generate_discrete_values(lower, upper)
     
-    crisp_value = defuzzify(fuzzy_output, universe, lower, upper)
+    with stage("task4", "rules", rules=len(rule_base), points=len(universe)):
+        fuzzy_output = apply_fuzzy_rules(input_vars, output_vars, rule_base, current_temp, universe)
+    
+    with stage("task4", "defuzzify", points=len(universe)):
+        crisp_value = defuzzify(fuzzy_output, universe, lower, upper)
     
     return crisp_value
 
 
+def main_batch(temperature_json: str, heat_lvl_json: str, mapping_json: str, temps, chunk_size=4096) -> np.ndarray:
+    controller = load_controller(temperature_json, heat_lvl_json, mapping_json)
+    with stage("task4", "batch", readings=int(np.size(temps)), rules=len(controller.rules)):
+        return controller.evaluate(temps, chunk_size)
+
+
 
 if __name__ == "__main__":
     temperature_json: str = read_json("task4/temperature.json")